@@ -1,42 +1,162 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, request, jsonify, g, Response
+import datetime
+import hashlib
 import json
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, Callable, Hashable, Optional
 
 from models.buyer import BuyerProfile
-from services.llm_service import LLMService
-from services.catalog_service import CatalogService
-from services.memory_service import MemoryService
-from services.purchase_service import PurchaseService
+from services.container import ServiceContainer
+from services.metrics_service import metrics
+from services.profiling_service import ProfilingService
 from config import Config
 
-app = Flask(__name__)
+api = Blueprint('api', __name__)
 
-# Initialize services
-llm_service = LLMService()
-catalog_service = CatalogService()
-memory_service = MemoryService()
-purchase_service = PurchaseService(memory_service, catalog_service)
+def create_app(services: Optional[ServiceContainer] = None) -> Flask:
+    """Create the Flask app.
 
-@app.route('/')
+    Services are constructed lazily on first use unless `services` provides them, and are
+    built up front only when Config.PRELOAD_SERVICES is set (e.g. gunicorn --preload).
+    """
+    app = Flask(__name__)
+    services = services or ServiceContainer()
+    app.extensions['services'] = services
+    
+    if Config.PRELOAD_SERVICES:
+        services.preload()
+    
+    if Config.METRICS_ENABLED:
+        _register_metrics(app)
+    if Config.PROFILING_ENABLED:
+        _register_profiling(app)
+    
+    app.register_blueprint(api)
+    return app
+
+def _services() -> ServiceContainer:
+    """Services of the app handling the current request"""
+    return current_app.extensions['services']
+
+def _register_metrics(app: Flask) -> None:
+    @app.before_request
+    def start_request_timer():
+        g.request_start_time = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('request_start_time', None)
+        if start is not None:
+            # Label by URL rule rather than raw path to keep series cardinality bounded
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.http_request_duration.observe(time.perf_counter() - start,
+                                                  method=request.method, route=route)
+            metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def get_metrics():
+        """Prometheus metrics endpoint"""
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def _register_profiling(app: Flask) -> None:
+    profiling_service = ProfilingService()
+
+    @app.before_request
+    def start_request_profile():
+        if profiling_service.should_profile(request.headers, request.args):
+            g.request_profile = profiling_service.start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            file_name, server_timing = profiling_service.finish(profile, request.method, route)
+            response.headers['Server-Timing'] = server_timing
+            if file_name:
+                response.headers['X-Profile-File'] = file_name
+        return response
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a stored ISO timestamp into an HTTP-date compatible datetime"""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value).replace(microsecond=0)
+
+def _settled_last_modified(last_modified: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Last-Modified to send, or None while it is still the current second (or later).
+
+    HTTP dates have second resolution, so another write later in the same second would get the
+    same Last-Modified and If-Modified-Since would wrongly answer 304; until the second is over
+    clients revalidate by ETag only. This also never sends a Last-Modified in the future.
+    """
+    if last_modified and last_modified >= datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0):
+        return None
+    return last_modified
+
+def _conditional_json(key: Hashable, last_modified: Optional[datetime.datetime],
+                      build: Callable[[], Dict[str, Any]]):
+    """Serve a JSON body with ETag/Last-Modified validators.
+
+    `key` must capture everything the body depends on (route, args, data versions), so the
+    ETag is derived from it without building the body, and `304 Not Modified` is answered
+    before any work. Otherwise the serialized body is served from the response cache,
+    calling `build` only on a miss.
+    """
+    etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+    last_modified = _settled_last_modified(last_modified)
+    
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(last_modified and request.if_modified_since
+                            and last_modified <= request.if_modified_since)
+    
+    if not_modified:
+        response = Response(status=304)
+    else:
+        response_cache = _services().response_cache
+        body = response_cache.get(key)
+        if body is None:
+            body = current_app.json.response(build()).get_data()
+            response_cache.set(key, body)
+        response = Response(body, mimetype=current_app.json.mimetype)
+    
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Let clients keep the body but revalidate on every poll
+    response.cache_control.no_cache = True
+    return response
+
+@api.route('/')
 def home():
     """API information endpoint"""
+    endpoints = {
+        "POST /buyer": "Add/update buyer profile",
+        "GET /buyer/<user_id>": "Get buyer profile",
+        "POST /analyze/<user_id>": "Analyze buyer and get recommendations",
+        "GET /search/<category>": "Search products by category",
+        "POST /purchase": "Simulate a purchase",
+        "GET /transactions/<user_id>": "Get transaction history",
+        "GET /categories": "Get all product categories",
+        "GET /catalog": "Get catalog version and reload status",
+        "POST /catalog/reload": "Reload the catalog from its source in the background"
+    }
+    if Config.METRICS_ENABLED:
+        endpoints["GET /metrics"] = "Prometheus metrics"
     return jsonify({
         "message": "AI Shopping Assistant API",
         "version": "1.0.0",
-        "endpoints": {
-            "POST /buyer": "Add/update buyer profile",
-            "GET /buyer/<user_id>": "Get buyer profile",
-            "POST /analyze/<user_id>": "Analyze buyer and get recommendations",
-            "GET /search/<category>": "Search products by category",
-            "POST /purchase": "Simulate a purchase",
-            "GET /transactions/<user_id>": "Get transaction history",
-            "GET /categories": "Get all product categories"
-        }
+        "endpoints": endpoints
     })
 
-@app.route('/buyer', methods=['POST'])
+@api.route('/buyer', methods=['POST'])
 def add_buyer():
     """Add or update buyer profile"""
+    services = _services()
     try:
         data = request.get_json()
         
@@ -48,7 +168,7 @@ def add_buyer():
         buyer_profile = BuyerProfile.from_json(data)
         
         # Store in memory
-        success = memory_service.store_buyer_profile(buyer_profile)
+        success = services.memory_service.store_buyer_profile(buyer_profile)
         
         if success:
             return jsonify({
@@ -62,53 +182,67 @@ def add_buyer():
     except Exception as e:
         return jsonify({"error": f"Invalid request: {str(e)}"}), 400
 
-@app.route('/buyer/<user_id>', methods=['GET'])
+@api.route('/buyer/<user_id>', methods=['GET'])
 def get_buyer(user_id):
     """Get buyer profile"""
+    services = _services()
     try:
-        buyer_profile = memory_service.get_buyer_profile(user_id)
+        buyer_profile = services.memory_service.get_buyer_profile(user_id)
         
         if buyer_profile:
-            return jsonify({
-                "user_id": buyer_profile.user_id,
-                "history": buyer_profile.history,
-                "categories": buyer_profile.get_product_categories(),
-                "price_range": buyer_profile.get_price_range()
-            })
+            return _conditional_json(
+                ('buyer', user_id, buyer_profile.fingerprint()),
+                _parse_timestamp(buyer_profile.updated_at),
+                lambda: {
+                    "user_id": buyer_profile.user_id,
+                    "history": buyer_profile.history,
+                    "categories": buyer_profile.get_product_categories(),
+                    "price_range": buyer_profile.get_price_range()
+                }
+            )
         else:
             return jsonify({"error": "Buyer not found"}), 404
             
     except Exception as e:
         return jsonify({"error": f"Error retrieving buyer: {str(e)}"}), 500
 
-@app.route('/analyze/<user_id>', methods=['POST'])
+@api.route('/analyze/<user_id>', methods=['POST'])
 def analyze_and_recommend(user_id):
     """Analyze buyer history and provide recommendations"""
+    services = _services()
     try:
+        stage = metrics.analyze_stage_duration
+        
         # Get buyer profile
-        buyer_profile = memory_service.get_buyer_profile(user_id)
+        with metrics.time(stage, stage="profile_load"):
+            buyer_profile = services.memory_service.get_buyer_profile(user_id)
         if not buyer_profile:
             return jsonify({"error": "Buyer not found"}), 404
         
         # Analyze buyer history
-        analysis = llm_service.analyze_buyer_history(buyer_profile)
+        with metrics.time(stage, stage="llm_analyze"):
+            analysis = services.llm_service.analyze_buyer_history(buyer_profile)
         
         # Get product recommendation
-        recommendation = llm_service.recommend_product_category(buyer_profile, analysis)
+        with metrics.time(stage, stage="llm_recommend"):
+            recommendation = services.llm_service.recommend_product_category(buyer_profile, analysis)
         
         # Get justification
-        justification = llm_service.justify_recommendation(recommendation, buyer_profile)
+        with metrics.time(stage, stage="llm_justify"):
+            justification = services.llm_service.justify_recommendation(recommendation, buyer_profile)
         
         # Search for products in recommended category
-        recommended_products = catalog_service.search_by_category(
-            recommendation.get('recommended_category', 'electronics'),
-            Config.MAX_SEARCH_RESULTS
-        )
+        with metrics.time(stage, stage="catalog_search"):
+            recommended_products = services.catalog_service.snapshot().search_by_category(
+                recommendation.get('recommended_category', 'electronics'),
+                Config.MAX_SEARCH_RESULTS
+            )
         
         # Rank products based on buyer preferences
-        ranked_products = catalog_service.rank_products_by_preferences(
-            recommended_products, buyer_profile
-        )
+        with metrics.time(stage, stage="catalog_rank"):
+            ranked_products = services.catalog_service.rank_products_by_preferences(
+                recommended_products, buyer_profile
+            )
         
         return jsonify({
             "user_id": user_id,
@@ -123,34 +257,46 @@ def analyze_and_recommend(user_id):
     except Exception as e:
         return jsonify({"error": f"Error analyzing buyer: {str(e)}"}), 500
 
-@app.route('/search/<category>', methods=['GET'])
+@api.route('/search/<category>', methods=['GET'])
 def search_products(category):
     """Search products by category"""
+    services = _services()
     try:
+        catalog_service = services.catalog_service
+        # One snapshot per request, so a concurrent reload cannot change the catalog under us
+        catalog = catalog_service.snapshot()
         max_results = request.args.get('max_results', Config.MAX_SEARCH_RESULTS, type=int)
         user_id = request.args.get('user_id')
         
-        # Search products
-        products = catalog_service.search_by_category(category, max_results)
+        # If user_id provided, results are ranked by their preferences
+        buyer_profile = services.memory_service.get_buyer_profile(user_id) if user_id else None
+        last_modified = catalog.loaded_at
+        profile_updated_at = _parse_timestamp(buyer_profile.updated_at) if buyer_profile else None
+        if profile_updated_at:
+            last_modified = max(last_modified, profile_updated_at)
         
-        # If user_id provided, rank by their preferences
-        if user_id:
-            buyer_profile = memory_service.get_buyer_profile(user_id)
+        def build():
+            # Search products
+            products = catalog.search_by_category(category, max_results)
             if buyer_profile:
                 products = catalog_service.rank_products_by_preferences(products, buyer_profile)
+            return {
+                "category": category,
+                "total_found": len(products),
+                "products": products
+            }
         
-        return jsonify({
-            "category": category,
-            "total_found": len(products),
-            "products": products
-        })
+        key = ('search', category, max_results, user_id,
+               buyer_profile.fingerprint() if buyer_profile else None, catalog.version)
+        return _conditional_json(key, last_modified, build)
         
     except Exception as e:
         return jsonify({"error": f"Error searching products: {str(e)}"}), 500
 
-@app.route('/purchase', methods=['POST'])
+@api.route('/purchase', methods=['POST'])
 def simulate_purchase():
     """Simulate a product purchase"""
+    services = _services()
     try:
         data = request.get_json()
         
@@ -159,7 +305,7 @@ def simulate_purchase():
             return jsonify({"error": "user_id and product_id are required"}), 400
         
         # Simulate purchase
-        result = purchase_service.simulate_purchase(data['user_id'], data['product_id'])
+        result = services.purchase_service.simulate_purchase(data['user_id'], data['product_id'])
         
         if result['success']:
             return jsonify(result), 201
@@ -169,11 +315,12 @@ def simulate_purchase():
     except Exception as e:
         return jsonify({"error": f"Purchase failed: {str(e)}"}), 500
 
-@app.route('/transactions/<user_id>', methods=['GET'])
+@api.route('/transactions/<user_id>', methods=['GET'])
 def get_transactions(user_id):
     """Get transaction history for a user"""
+    services = _services()
     try:
-        transactions = purchase_service.get_transaction_history(user_id)
+        transactions = services.purchase_service.get_transaction_history(user_id)
         
         return jsonify({
             "user_id": user_id,
@@ -184,25 +331,67 @@ def get_transactions(user_id):
     except Exception as e:
         return jsonify({"error": f"Error retrieving transactions: {str(e)}"}), 500
 
-@app.route('/categories', methods=['GET'])
+@api.route('/categories', methods=['GET'])
 def get_categories():
     """Get all available product categories"""
     try:
-        categories = catalog_service.get_all_categories()
+        catalog = _services().catalog_service.snapshot()
+        
+        def build():
+            categories = catalog.get_all_categories()
+            return {
+                "categories": categories,
+                "total_categories": len(categories)
+            }
+        
+        return _conditional_json(('categories', catalog.version), catalog.loaded_at, build)
+        
+    except Exception as e:
+        return jsonify({"error": f"Error retrieving categories: {str(e)}"}), 500
+
+@api.route('/catalog', methods=['GET'])
+def get_catalog_status():
+    """Get the catalog version currently served and the reload status"""
+    try:
+        catalog_service = _services().catalog_service
+        catalog = catalog_service.snapshot()
         
         return jsonify({
-            "categories": categories,
-            "total_categories": len(categories)
+            "version": catalog.version,
+            "loaded_at": catalog.loaded_at.isoformat(),
+            "total_products": len(catalog),
+            # Reload status is per worker process
+            "pid": os.getpid(),
+            "reloading": catalog_service.reloading,
+            "last_reload_seconds": catalog_service.last_reload_seconds,
+            "last_reload_error": catalog_service.last_reload_error
         })
         
     except Exception as e:
-        return jsonify({"error": f"Error retrieving categories: {str(e)}"}), 500
+        return jsonify({"error": f"Error retrieving catalog status: {str(e)}"}), 500
 
-@app.route('/buyers', methods=['GET'])
+@api.route('/catalog/reload', methods=['POST'])
+def reload_catalog():
+    """Rebuild the catalog from its source in the background and swap it in"""
+    try:
+        catalog_service = _services().catalog_service
+        if not catalog_service.reload_in_background():
+            return jsonify({"error": "Catalog reload already in progress"}), 409
+        
+        return jsonify({
+            "message": "Catalog reload started",
+            "version": catalog_service.version
+        }), 202
+        
+    except Exception as e:
+        return jsonify({"error": f"Error reloading catalog: {str(e)}"}), 500
+
+@api.route('/buyers', methods=['GET'])
 def get_all_buyers():
     """Get all stored buyer profiles"""
+    services = _services()
     try:
-        buyers = memory_service.get_all_buyers()
+        buyers = services.memory_service.get_all_buyers()
         
         return jsonify({
             "total_buyers": len(buyers),
@@ -212,7 +401,10 @@ def get_all_buyers():
     except Exception as e:
         return jsonify({"error": f"Error retrieving buyers: {str(e)}"}), 500
 
+app = create_app()
+
 if __name__ == '__main__':
+    catalog_service = app.extensions['services'].catalog_service
     print("🛍️  AI Shopping Assistant API Starting...")
     print(f"📊 Memory Type: {Config.MEMORY_TYPE}")
     print(f"🔑 Using DeepSeek API")
@@ -0,0 +1,481 @@
+"""ASGI serving mode for the AI Shopping Assistant API.
+
+Exposes the same routes and JSON shapes as app.py on Starlette, awaiting the LLM through
+AsyncLLMService and buyer storage through AsyncMemoryService, so a request waiting on the
+LLM does not hold a worker thread. Run with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from email.utils import parsedate_to_datetime
+import asyncio
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Any, Callable, Hashable, Optional
+
+from models.buyer import BuyerProfile
+from services.container import ServiceContainer
+from services.metrics_service import metrics
+from services.profiling_service import ProfilingService
+from config import Config
+
+
+class FlaskCompatibleJSONResponse(JSONResponse):
+    """JSON response encoded like Flask's jsonify (sorted keys, ASCII, trailing newline)"""
+
+    def render(self, content: Any) -> bytes:
+        return (json.dumps(content, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _json(content: Any, status_code: int = 200) -> FlaskCompatibleJSONResponse:
+    return FlaskCompatibleJSONResponse(content, status_code=status_code)
+
+
+def _services(request: Request) -> ServiceContainer:
+    """Services of the app handling the request"""
+    return request.app.state.services
+
+
+async def _catalog_snapshot(request: Request):
+    """Current catalog snapshot, building the catalog in a worker thread if needed.
+
+    Building parses and indexes (or publishes) the whole catalog, which on the event loop would
+    stall every request in flight.
+    """
+    catalog_service = _services(request).catalog_service
+    if catalog_service.is_built:
+        return catalog_service.snapshot()
+    return await asyncio.to_thread(catalog_service.snapshot)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a stored ISO timestamp into an HTTP-date compatible datetime"""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value).replace(microsecond=0)
+
+
+def _http_date(value: datetime.datetime) -> str:
+    return value.astimezone(datetime.timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+
+def _settled_last_modified(last_modified: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Last-Modified to send, or None while it is still the current second (see app._settled_last_modified)"""
+    if last_modified and last_modified >= datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0):
+        return None
+    return last_modified
+
+
+def _conditional_json(request: Request, key: Hashable, last_modified: Optional[datetime.datetime],
+                      build: Callable[[], Dict[str, Any]]) -> Response:
+    """Serve a JSON body with ETag/Last-Modified validators (see app._conditional_json)"""
+    etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+    quoted_etag = f'"{etag}"'
+    last_modified = _settled_last_modified(last_modified)
+
+    if_none_match = request.headers.get('if-none-match')
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        candidates = [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+        not_modified = quoted_etag in candidates or '*' in candidates
+    elif last_modified and if_modified_since:
+        try:
+            not_modified = last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            not_modified = False
+    else:
+        not_modified = False
+
+    headers = {'ETag': quoted_etag, 'Cache-Control': 'no-cache'}
+    if last_modified:
+        headers['Last-Modified'] = _http_date(last_modified)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response_cache = _services(request).response_cache
+    body = response_cache.get(key)
+    if body is None:
+        body = FlaskCompatibleJSONResponse(build()).body
+        response_cache.set(key, body)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+async def home(request: Request):
+    """API information endpoint"""
+    endpoints = {
+        "POST /buyer": "Add/update buyer profile",
+        "GET /buyer/<user_id>": "Get buyer profile",
+        "POST /analyze/<user_id>": "Analyze buyer and get recommendations",
+        "GET /search/<category>": "Search products by category",
+        "POST /purchase": "Simulate a purchase",
+        "GET /transactions/<user_id>": "Get transaction history",
+        "GET /categories": "Get all product categories",
+        "GET /catalog": "Get catalog version and reload status",
+        "POST /catalog/reload": "Reload the catalog from its source in the background"
+    }
+    if Config.METRICS_ENABLED:
+        endpoints["GET /metrics"] = "Prometheus metrics"
+    return _json({
+        "message": "AI Shopping Assistant API",
+        "version": "1.0.0",
+        "endpoints": endpoints
+    })
+
+
+async def add_buyer(request: Request):
+    """Add or update buyer profile"""
+    try:
+        data = await request.json()
+
+        # Validate required fields
+        if 'user_id' not in data:
+            return _json({"error": "user_id is required"}, 400)
+
+        # Create buyer profile
+        buyer_profile = BuyerProfile.from_json(data)
+
+        # Store in memory
+        success = await _services(request).async_memory_service.store_buyer_profile(buyer_profile)
+
+        if success:
+            return _json({
+                "message": "Buyer profile stored successfully",
+                "user_id": buyer_profile.user_id,
+                "history_count": len(buyer_profile.history)
+            }, 201)
+        else:
+            return _json({"error": "Failed to store buyer profile"}, 500)
+
+    except Exception as e:
+        return _json({"error": f"Invalid request: {str(e)}"}, 400)
+
+
+async def get_buyer(request: Request):
+    """Get buyer profile"""
+    user_id = request.path_params['user_id']
+    try:
+        buyer_profile = await _services(request).async_memory_service.get_buyer_profile(user_id)
+
+        if buyer_profile:
+            return _conditional_json(
+                request,
+                ('buyer', user_id, buyer_profile.fingerprint()),
+                _parse_timestamp(buyer_profile.updated_at),
+                lambda: {
+                    "user_id": buyer_profile.user_id,
+                    "history": buyer_profile.history,
+                    "categories": buyer_profile.get_product_categories(),
+                    "price_range": buyer_profile.get_price_range()
+                }
+            )
+        else:
+            return _json({"error": "Buyer not found"}, 404)
+
+    except Exception as e:
+        return _json({"error": f"Error retrieving buyer: {str(e)}"}, 500)
+
+
+async def analyze_and_recommend(request: Request):
+    """Analyze buyer history and provide recommendations"""
+    user_id = request.path_params['user_id']
+    services = _services(request)
+    try:
+        stage = metrics.analyze_stage_duration
+        llm_service = services.async_llm_service
+
+        # Get buyer profile
+        with metrics.time(stage, stage="profile_load"):
+            buyer_profile = await services.async_memory_service.get_buyer_profile(user_id)
+        if not buyer_profile:
+            return _json({"error": "Buyer not found"}, 404)
+
+        # Analyze buyer history
+        with metrics.time(stage, stage="llm_analyze"):
+            analysis = await llm_service.analyze_buyer_history(buyer_profile)
+
+        # Get product recommendation
+        with metrics.time(stage, stage="llm_recommend"):
+            recommendation = await llm_service.recommend_product_category(buyer_profile, analysis)
+
+        # Get justification
+        with metrics.time(stage, stage="llm_justify"):
+            justification = await llm_service.justify_recommendation(recommendation, buyer_profile)
+
+        # Search for products in recommended category
+        with metrics.time(stage, stage="catalog_search"):
+            recommended_products = (await _catalog_snapshot(request)).search_by_category(
+                recommendation.get('recommended_category', 'electronics'),
+                Config.MAX_SEARCH_RESULTS
+            )
+
+        # Rank products based on buyer preferences
+        with metrics.time(stage, stage="catalog_rank"):
+            ranked_products = services.catalog_service.rank_products_by_preferences(
+                recommended_products, buyer_profile
+            )
+
+        return _json({
+            "user_id": user_id,
+            "analysis": analysis,
+            "recommendation": recommendation,
+            "justification": justification,
+            "recommended_products": ranked_products,
+            "current_categories": buyer_profile.get_product_categories(),
+            "price_range": buyer_profile.get_price_range()
+        })
+
+    except Exception as e:
+        return _json({"error": f"Error analyzing buyer: {str(e)}"}, 500)
+
+
+async def search_products(request: Request):
+    """Search products by category"""
+    category = request.path_params['category']
+    services = _services(request)
+    try:
+        catalog_service = services.catalog_service
+        # One snapshot per request, so a concurrent reload cannot change the catalog under us
+        catalog = await _catalog_snapshot(request)
+        try:
+            max_results = int(request.query_params.get('max_results', Config.MAX_SEARCH_RESULTS))
+        except ValueError:
+            max_results = Config.MAX_SEARCH_RESULTS
+        user_id = request.query_params.get('user_id')
+
+        # If user_id provided, results are ranked by their preferences
+        buyer_profile = await services.async_memory_service.get_buyer_profile(user_id) if user_id else None
+        last_modified = catalog.loaded_at
+        profile_updated_at = _parse_timestamp(buyer_profile.updated_at) if buyer_profile else None
+        if profile_updated_at:
+            last_modified = max(last_modified, profile_updated_at)
+
+        def build():
+            # Search products
+            products = catalog.search_by_category(category, max_results)
+            if buyer_profile:
+                products = catalog_service.rank_products_by_preferences(products, buyer_profile)
+            return {
+                "category": category,
+                "total_found": len(products),
+                "products": products
+            }
+
+        key = ('search', category, max_results, user_id,
+               buyer_profile.fingerprint() if buyer_profile else None, catalog.version)
+        return _conditional_json(request, key, last_modified, build)
+
+    except Exception as e:
+        return _json({"error": f"Error searching products: {str(e)}"}, 500)
+
+
+async def simulate_purchase(request: Request):
+    """Simulate a product purchase"""
+    services = _services(request)
+    try:
+        data = await request.json()
+
+        # Validate required fields
+        if 'user_id' not in data or 'product_id' not in data:
+            return _json({"error": "user_id and product_id are required"}, 400)
+
+        # Simulate purchase; it updates buyer storage, so it runs as a storage write
+        result = await services.async_memory_service.run_write(
+            services.purchase_service.simulate_purchase, data['user_id'], data['product_id']
+        )
+
+        if result['success']:
+            return _json(result, 201)
+        else:
+            return _json(result, 400)
+
+    except Exception as e:
+        return _json({"error": f"Purchase failed: {str(e)}"}, 500)
+
+
+async def get_transactions(request: Request):
+    """Get transaction history for a user"""
+    user_id = request.path_params['user_id']
+    try:
+        transactions = _services(request).purchase_service.get_transaction_history(user_id)
+
+        return _json({
+            "user_id": user_id,
+            "total_transactions": len(transactions),
+            "transactions": transactions
+        })
+
+    except Exception as e:
+        return _json({"error": f"Error retrieving transactions: {str(e)}"}, 500)
+
+
+async def get_categories(request: Request):
+    """Get all available product categories"""
+    try:
+        catalog = await _catalog_snapshot(request)
+
+        def build():
+            categories = catalog.get_all_categories()
+            return {
+                "categories": categories,
+                "total_categories": len(categories)
+            }
+
+        return _conditional_json(request, ('categories', catalog.version), catalog.loaded_at, build)
+
+    except Exception as e:
+        return _json({"error": f"Error retrieving categories: {str(e)}"}, 500)
+
+
+async def get_catalog_status(request: Request):
+    """Get the catalog version currently served and the reload status"""
+    try:
+        catalog_service = _services(request).catalog_service
+        catalog = await _catalog_snapshot(request)
+
+        return _json({
+            "version": catalog.version,
+            "loaded_at": catalog.loaded_at.isoformat(),
+            "total_products": len(catalog),
+            # Reload status is per worker process
+            "pid": os.getpid(),
+            "reloading": catalog_service.reloading,
+            "last_reload_seconds": catalog_service.last_reload_seconds,
+            "last_reload_error": catalog_service.last_reload_error
+        })
+
+    except Exception as e:
+        return _json({"error": f"Error retrieving catalog status: {str(e)}"}, 500)
+
+
+async def reload_catalog(request: Request):
+    """Rebuild the catalog from its source in the background and swap it in"""
+    try:
+        catalog_service = _services(request).catalog_service
+        catalog = await _catalog_snapshot(request)
+        if not catalog_service.reload_in_background():
+            return _json({"error": "Catalog reload already in progress"}, 409)
+
+        return _json({
+            "message": "Catalog reload started",
+            "version": catalog.version
+        }, 202)
+
+    except Exception as e:
+        return _json({"error": f"Error reloading catalog: {str(e)}"}, 500)
+
+
+async def get_all_buyers(request: Request):
+    """Get all stored buyer profiles"""
+    try:
+        buyers = await _services(request).async_memory_service.get_all_buyers()
+
+        return _json({
+            "total_buyers": len(buyers),
+            "buyers": buyers
+        })
+
+    except Exception as e:
+        return _json({"error": f"Error retrieving buyers: {str(e)}"}, 500)
+
+
+async def get_metrics(request: Request):
+    """Prometheus metrics endpoint"""
+    return Response(metrics.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+def _route_label(path: str) -> str:
+    """Route in the Flask rule syntax, so both serving modes share metric series and profile names"""
+    return re.sub(r'\{(\w+)\}', r'<\1>', path)
+
+
+def _profiled(path: str, endpoint: Callable, profiling_service: ProfilingService) -> Callable:
+    """Wrap an endpoint with the opt-in request profiling of app.py (see ProfilingService)"""
+    route = _route_label(path)
+
+    async def handler(request: Request):
+        if not profiling_service.should_profile(request.headers, request.query_params):
+            return await endpoint(request)
+        profile = profiling_service.start()
+        try:
+            response = await endpoint(request)
+        except BaseException:
+            profiling_service.finish(profile, request.method, route)
+            raise
+        file_name, server_timing = profiling_service.finish(profile, request.method, route)
+        response.headers['Server-Timing'] = server_timing
+        if file_name:
+            response.headers['X-Profile-File'] = file_name
+        return response
+
+    return handler
+
+
+def _instrumented(path: str, endpoint: Callable) -> Callable:
+    """Wrap an endpoint with the per-route request metrics recorded by app.py"""
+    route = _route_label(path)
+
+    async def handler(request: Request):
+        start = time.perf_counter()
+        response = await endpoint(request)
+        metrics.http_request_duration.observe(time.perf_counter() - start, method=request.method, route=route)
+        metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+        return response
+
+    return handler
+
+
+ROUTES = [
+    ('/', home, ['GET']),
+    ('/buyer', add_buyer, ['POST']),
+    ('/buyer/{user_id}', get_buyer, ['GET']),
+    ('/analyze/{user_id}', analyze_and_recommend, ['POST']),
+    ('/search/{category}', search_products, ['GET']),
+    ('/purchase', simulate_purchase, ['POST']),
+    ('/transactions/{user_id}', get_transactions, ['GET']),
+    ('/categories', get_categories, ['GET']),
+    ('/catalog', get_catalog_status, ['GET']),
+    ('/catalog/reload', reload_catalog, ['POST']),
+    ('/buyers', get_all_buyers, ['GET']),
+]
+
+
+def create_asgi_app(services: Optional[ServiceContainer] = None) -> Starlette:
+    """Create the ASGI app; services are shared with app.create_app() semantics"""
+    routes = ROUTES
+    if Config.PROFILING_ENABLED:
+        profiling_service = ProfilingService()
+        routes = [(path, _profiled(path, endpoint, profiling_service), methods) for path, endpoint, methods in routes]
+    if Config.METRICS_ENABLED:
+        routes = [(path, _instrumented(path, endpoint), methods) for path, endpoint, methods in routes]
+        routes.append(('/metrics', get_metrics, ['GET']))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        # Build the catalog before serving, off the event loop (a no-op if preloaded below)
+        try:
+            await asyncio.to_thread(app.state.services.catalog_service.build_indexes)
+        except Exception as e:
+            print(f"Error building catalog: {e}")
+        yield
+
+    app = Starlette(routes=[Route(path, endpoint, methods=methods) for path, endpoint, methods in routes],
+                    lifespan=lifespan)
+    app.state.services = services or ServiceContainer()
+
+    if Config.PRELOAD_SERVICES:
+        app.state.services.preload()
+
+    return app
+
+
+app = create_asgi_app()
@@ -0,0 +1,233 @@
+"""Load test comparing the Flask (WSGI) and ASGI serving modes against a local stub LLM.
+
+Starts the stub LLM (benchmarks.stub_llm) and each server in its own process, seeds a buyer,
+then fires `--requests` POST /analyze calls with `--concurrency` in flight and reports
+throughput and latency percentiles as JSON. The Flask app is served by a WSGI server with a
+fixed thread pool (`--flask-threads`), like a single gunicorn gthread worker; the ASGI app
+runs in a single uvicorn process.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --concurrency 1000 --requests 2000 --llm-delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+BUYER = {
+    "user_id": "LOAD1",
+    "history": [
+        {"product": "Bluetooth headphones", "category": "electronics", "price": 120},
+        {"product": "Blender", "category": "kitchen", "price": 70}
+    ]
+}
+
+
+def _configure(llm_url: str) -> None:
+    """Point the services at the stub LLM and in-process storage"""
+    from config import Config
+    Config.DEEPSEEK_BASE_URL = llm_url
+    Config.MEMORY_TYPE = "memory"
+    Config.PRELOAD_SERVICES = True
+
+
+def serve_flask(port: int, llm_url: str, threads: int) -> None:
+    """Serve app.create_app() from a WSGI server with a fixed-size thread pool"""
+    _configure(llm_url)
+    from werkzeug.serving import BaseWSGIServer
+    from app import create_app
+
+    class PooledWSGIServer(BaseWSGIServer):
+        request_queue_size = 4096
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process_request_thread, request, client_address)
+
+        def _process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer(HOST, port, create_app()).serve_forever()
+
+
+def serve_asgi(port: int, llm_url: str) -> None:
+    """Serve asgi_app.create_asgi_app() from a single uvicorn process"""
+    _configure(llm_url)
+    import uvicorn
+    from asgi_app import create_asgi_app
+
+    uvicorn.run(create_asgi_app(), host=HOST, port=port, log_level="warning", backlog=4096)
+
+
+async def _request(port: int, method: str, path: str, body: dict = None):
+    """Minimal HTTP/1.1 client: one connection per request"""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, response_body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), response_body
+
+
+async def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(HOST, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def _run_load(port: int, total: int, concurrency: int) -> dict:
+    await _wait_for_port(port)
+    status, _ = await _request(port, "POST", "/buyer", BUYER)
+    if status != 201:
+        raise RuntimeError(f"seeding buyer failed with status {status}")
+    # Warm up: first LLM call, connection pools, catalog indexes
+    await _request(port, "POST", f"/analyze/{BUYER['user_id']}")
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status, _ = await _request(port, "POST", f"/analyze/{BUYER['user_id']}")
+                ok = status == 200
+            except OSError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else None
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_s": {
+            "mean": statistics.mean(latencies) if latencies else None,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _spawn(*args: str) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *args], cwd=REPO_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run(args) -> dict:
+    llm_port = _free_port()
+    llm_url = f"http://{HOST}:{llm_port}"
+    stub = _spawn("benchmarks.stub_llm", "--port", str(llm_port), "--delay", str(args.llm_delay))
+    results = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "llm_delay_s": args.llm_delay,
+        "flask_threads": args.flask_threads,
+        "modes": {},
+    }
+    try:
+        asyncio.run(_wait_for_port(llm_port))
+        modes = {
+            "flask": ("serve-flask", "--threads", str(args.flask_threads)),
+            "asgi": ("serve-asgi",),
+        }
+        for mode in args.modes:
+            port = _free_port()
+            server = _spawn("benchmarks.load_test", *modes[mode], "--port", str(port), "--llm-url", llm_url)
+            try:
+                results["modes"][mode] = asyncio.run(_run_load(port, args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs ASGI load test against a stub LLM")
+    subparsers = parser.add_subparsers(dest="command")
+
+    flask_parser = subparsers.add_parser("serve-flask", help="(internal) run the Flask server")
+    flask_parser.add_argument("--port", type=int, required=True)
+    flask_parser.add_argument("--llm-url", required=True)
+    flask_parser.add_argument("--threads", type=int, default=32)
+
+    asgi_parser = subparsers.add_parser("serve-asgi", help="(internal) run the ASGI server")
+    asgi_parser.add_argument("--port", type=int, required=True)
+    asgi_parser.add_argument("--llm-url", required=True)
+
+    parser.add_argument("--concurrency", type=int, default=500, help="requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="total /analyze requests per mode")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="stub LLM latency per call (s)")
+    parser.add_argument("--flask-threads", type=int, default=32, help="WSGI thread pool size")
+    parser.add_argument("--modes", nargs="+", choices=["flask", "asgi"], default=["flask", "asgi"])
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.command == "serve-flask":
+        serve_flask(args.port, args.llm_url, args.threads)
+    elif args.command == "serve-asgi":
+        serve_asgi(args.port, args.llm_url)
+    else:
+        text = json.dumps(run(args), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Benchmark suite for storage, buyer profiles, the catalog and every API route.
+
+Data comes from the seeded generators in benchmarks.synthetic and the LLM is the in-process
+StubLLMClient, so runs need no network or API key and are repeatable. Suites:
+
+- storage: MemoryService reads/writes per backend (memory, file) for each buyer count
+- profile: BuyerProfile aggregates per history length, and over whole buyer populations
+- catalog: CatalogService build/reload, search, rank and lookup (in-memory and shared)
+- e2e: latency and throughput of every Flask route through the test client
+
+Every result is a flat record with a stable `name` and `per_op_s` (seconds per operation: the
+best repeat for microbenchmarks, the mean request latency for routes). The run is printed as
+JSON; pass a previous run to `--compare` to list changes per benchmark between commits.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --scale small --output baseline.json
+    python -m benchmarks.run_benchmarks --scale small --compare baseline.json --fail-on-regression
+    python -m benchmarks.run_benchmarks --suites catalog --products 1000 1000000
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.stub_llm import StubLLMClient
+from benchmarks.synthetic import CATEGORIES, generate_buyer, generate_products, iter_buyers, user_id
+from config import Config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCALES = {
+    "small": {"buyers": [1000], "products": [1000]},
+    "medium": {"buyers": [1000, 100000], "products": [1000, 100000]},
+    "large": {"buyers": [1000, 100000, 1000000], "products": [1000, 100000, 1000000]},
+}
+SUITES = ("storage", "profile", "catalog", "e2e")
+
+
+@contextlib.contextmanager
+def _config(**overrides):
+    """Temporarily override Config attributes (services read them when constructed)"""
+    previous = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+def _name(benchmark: str, params: Dict[str, Any]) -> str:
+    if not params:
+        return benchmark
+    return f"{benchmark}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def _progress(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def measure(benchmark: str, func: Callable[[], Any], repeat: int = 3, **params) -> Dict[str, Any]:
+    """Time func with timeit: calibrate the loop count to ~0.2s, then keep the best of repeat runs"""
+    # Keep the garbage collector on: allocation-heavy operations pay for it in production too
+    timer = timeit.Timer(func, setup=gc.enable)
+    number, _ = timer.autorange()
+    per_op = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    result = {
+        "name": _name(benchmark, params),
+        "params": params,
+        "number": number,
+        "repeat": repeat,
+        "per_op_s": min(per_op),
+        "median_s": statistics.median(per_op),
+        "ops_per_s": 1 / min(per_op) if min(per_op) else None,
+    }
+    _progress(f"{result['name']}: {result['per_op_s'] * 1e6:.1f} us/op")
+    return result
+
+
+def skipped(benchmark: str, reason: str, **params) -> Dict[str, Any]:
+    _progress(f"{_name(benchmark, params)}: skipped ({reason})")
+    return {"name": _name(benchmark, params), "params": params, "skipped": reason}
+
+
+def _cycle(values: List[Any], seed: int):
+    """Endless iterator over values in a seeded random order"""
+    values = list(values)
+    random.Random(seed).shuffle(values)
+    return itertools.cycle(values)
+
+
+def bench_storage(args) -> List[Dict[str, Any]]:
+    """MemoryService read/write latency per backend and buyer count"""
+    from services.memory_service import MemoryService
+    results = []
+    for count in args.buyers:
+        # Serialized once; each backend starts from its own copy, since writes append to stored histories
+        stored = json.dumps({buyer.user_id: buyer.to_dict() for buyer in iter_buyers(count, args.seed)})
+        sample_ids = random.Random(args.seed).sample([user_id(index) for index in range(1, count + 1)],
+                                                     min(count, 1000))
+        for backend in ("memory", "file"):
+            params = {"backend": backend, "buyers": count}
+            if backend == "file" and count > args.file_max_buyers:
+                for operation in ("get_buyer_profile", "store_buyer_profile", "update_buyer_history", "get_all_buyers"):
+                    results.append(skipped(f"storage.{operation}", "over --file-max-buyers", **params))
+                continue
+
+            with tempfile.TemporaryDirectory() as directory, \
+                    _config(MEMORY_TYPE=backend, MEMORY_FILE_PATH=os.path.join(directory, "buyers.json")):
+                memory_service = MemoryService()
+                if backend == "memory":
+                    memory_service.in_memory_storage = json.loads(stored)
+                else:
+                    memory_service._write_file_data(json.loads(stored))
+
+                reads = _cycle(sample_ids, args.seed)
+                profiles = _cycle([memory_service.get_buyer_profile(uid) for uid in sample_ids[:100]], args.seed)
+                updates = _cycle(sample_ids, args.seed + 1)
+                transaction = {"product": "Benchmark Item", "category": "books", "price": 20, "date": "2024-01-01"}
+
+                results.append(measure("storage.get_buyer_profile",
+                                       lambda: memory_service.get_buyer_profile(next(reads)), args.repeat, **params))
+                results.append(measure("storage.store_buyer_profile",
+                                       lambda: memory_service.store_buyer_profile(next(profiles)), args.repeat, **params))
+                results.append(measure("storage.update_buyer_history",
+                                       lambda: memory_service.update_buyer_history(next(updates), dict(transaction)),
+                                       args.repeat, **params))
+                results.append(measure("storage.get_all_buyers", memory_service.get_all_buyers, args.repeat, **params))
+                del memory_service
+        del stored
+    return results
+
+
+def bench_profile(args) -> List[Dict[str, Any]]:
+    """BuyerProfile aggregates and (de)serialization"""
+    from models.buyer import BuyerProfile
+    results = []
+    for length in args.history_lengths:
+        buyer = generate_buyer(length, args.seed)
+        stored = buyer.to_dict()
+        params = {"history": length}
+        results.append(measure("profile.get_product_categories", buyer.get_product_categories, args.repeat, **params))
+        results.append(measure("profile.get_price_range", buyer.get_price_range, args.repeat, **params))
+        results.append(measure("profile.to_dict", buyer.to_dict, args.repeat, **params))
+        results.append(measure("profile.from_json", lambda: BuyerProfile.from_json(stored), args.repeat, **params))
+
+    for count in args.buyers:
+        buyers = list(iter_buyers(count, args.seed))
+
+        def aggregate_all():
+            for buyer in buyers:
+                buyer.get_product_categories()
+                buyer.get_price_range()
+
+        result = measure("profile.aggregate_population", aggregate_all, args.repeat, buyers=count)
+        result["per_buyer_s"] = result["per_op_s"] / count
+        results.append(result)
+        del buyers
+    return results
+
+
+def bench_catalog(args) -> List[Dict[str, Any]]:
+    """CatalogService build, search, rank and lookup per catalog size and mode"""
+    from services.catalog_service import CatalogService
+    results = []
+    buyer = generate_buyer(20, args.seed)
+    for count in args.products:
+        products = generate_products(count, args.seed)
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = os.path.join(directory, "catalog.json")
+            with open(source_path, "w") as f:
+                json.dump({"products": products}, f)
+            del products
+
+            for mode in ("memory", "shared"):
+                params = {"mode": mode, "products": count}
+                shared_path = os.path.join(directory, "catalog.bin") if mode == "shared" else None
+                catalog_service = CatalogService(shared_path=shared_path, source_path=source_path)
+                catalog_service.build_indexes()
+
+                categories = itertools.cycle(CATEGORIES)
+                rng = random.Random(args.seed)
+                product_ids = itertools.cycle([rng.randint(1, count) for _ in range(10000)])
+
+                results.append(measure("catalog.reload", catalog_service.reload, args.repeat, **params))
+                results.append(measure("catalog.snapshot", catalog_service.snapshot, args.repeat, **params))
+                for max_results in (3, 50):
+                    results.append(measure(
+                        "catalog.search_by_category",
+                        lambda: catalog_service.search_by_category(next(categories), max_results),
+                        args.repeat, max_results=max_results, **params))
+                results.append(measure("catalog.get_product_by_id",
+                                       lambda: catalog_service.get_product_by_id(next(product_ids)),
+                                       args.repeat, **params))
+                results.append(measure("catalog.get_all_categories", catalog_service.get_all_categories,
+                                       args.repeat, **params))
+                for max_results in (3, 50, 1000):
+                    # Named after the requested size: small catalogs return fewer candidates
+                    candidates = catalog_service.search_by_category("electronics", max_results)
+                    result = measure(
+                        "catalog.rank_products_by_preferences",
+                        lambda: catalog_service.rank_products_by_preferences(candidates, buyer),
+                        args.repeat, max_results=max_results, **params)
+                    result["candidates"] = len(candidates)
+                    results.append(result)
+                del catalog_service
+    return results
+
+
+def _e2e_routes(services, buyer_ids: List[str], product_count: int, seed: int, client):
+    """(name, method, path(i), body(i), headers, expected statuses, after(response)) for every route"""
+    rng = random.Random(seed)
+    buyer_etag = client.get(f"/buyer/{buyer_ids[0]}").headers["ETag"]
+    search_etag = client.get("/search/books").headers["ETag"]
+    catalog_service = services.catalog_service
+
+    def new_buyer(i):
+        return {"user_id": f"NEW{i:07d}", "history": generate_buyer(8, seed + i).history}
+
+    def wait_for_reload(response):
+        while catalog_service.reloading:
+            time.sleep(0.001)
+        return response
+
+    return [
+        ("GET /", "GET", lambda i: "/", None, {}, {200}, None),
+        ("POST /buyer", "POST", lambda i: "/buyer", new_buyer, {}, {201}, None),
+        ("GET /buyer/<user_id>", "GET", lambda i: f"/buyer/{buyer_ids[i % len(buyer_ids)]}", None, {}, {200}, None),
+        ("GET /buyer/<user_id> (304)", "GET", lambda i: f"/buyer/{buyer_ids[0]}", None,
+         {"If-None-Match": buyer_etag}, {304}, None),
+        ("POST /analyze/<user_id>", "POST", lambda i: f"/analyze/{buyer_ids[i % len(buyer_ids)]}", None, {}, {200}, None),
+        ("GET /search/<category>", "GET", lambda i: f"/search/{CATEGORIES[i % len(CATEGORIES)]}", None, {}, {200}, None),
+        ("GET /search/<category>?user_id", "GET",
+         lambda i: f"/search/{CATEGORIES[i % len(CATEGORIES)]}?user_id={buyer_ids[i % len(buyer_ids)]}&max_results=20",
+         None, {}, {200}, None),
+        ("GET /search/<category> (304)", "GET", lambda i: "/search/books", None,
+         {"If-None-Match": search_etag}, {304}, None),
+        ("POST /purchase", "POST", lambda i: "/purchase",
+         lambda i: {"user_id": buyer_ids[i % len(buyer_ids)], "product_id": rng.randint(1, product_count)},
+         {}, {201}, None),
+        ("GET /transactions/<user_id>", "GET", lambda i: f"/transactions/{buyer_ids[i % len(buyer_ids)]}",
+         None, {}, {200}, None),
+        ("GET /categories", "GET", lambda i: "/categories", None, {}, {200}, None),
+        ("GET /buyers", "GET", lambda i: "/buyers", None, {}, {200}, None),
+        ("GET /catalog", "GET", lambda i: "/catalog", None, {}, {200}, None),
+        # Includes waiting for the background rebuild, so this is the full reload latency
+        ("POST /catalog/reload", "POST", lambda i: "/catalog/reload", None, {}, {202}, wait_for_reload),
+        ("GET /metrics", "GET", lambda i: "/metrics", None, {}, {200}, None),
+    ]
+
+
+def bench_e2e(args) -> List[Dict[str, Any]]:
+    """Per-route latency and throughput through the Flask test client with a stub LLM"""
+    from app import create_app
+    from services.catalog_service import CatalogService
+    from services.container import ServiceContainer
+    from services.llm_service import LLMService
+    from services.memory_service import MemoryService
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory, _config(MEMORY_TYPE="memory", PROFILING_ENABLED=False):
+        source_path = os.path.join(directory, "catalog.json")
+        with open(source_path, "w") as f:
+            json.dump({"products": generate_products(args.e2e_products, args.seed)}, f)
+
+        llm_service = LLMService()
+        llm_service.client = StubLLMClient(args.llm_delay)
+        memory_service = MemoryService()
+        for buyer in iter_buyers(args.e2e_buyers, args.seed):
+            memory_service.store_buyer_profile(buyer)
+        services = ServiceContainer(llm_service=llm_service, memory_service=memory_service,
+                                    catalog_service=CatalogService(source_path=source_path))
+        services.preload()
+        client = create_app(services).test_client()
+
+        buyer_ids = [user_id(index) for index in range(1, args.e2e_buyers + 1)]
+        random.Random(args.seed).shuffle(buyer_ids)
+        params = {"buyers": args.e2e_buyers, "products": args.e2e_products, "llm_delay": args.llm_delay}
+
+        for route, method, path, body, headers, expected, after in _e2e_routes(
+                services, buyer_ids, args.e2e_products, args.seed, client):
+            def call(i):
+                response = client.open(path(i), method=method, json=body(i) if body else None, headers=headers)
+                return after(response) if after else response
+
+            for i in range(args.warmup):
+                call(i)
+
+            latencies = []
+            errors = 0
+            started = time.perf_counter()
+            for i in range(args.warmup, args.warmup + args.requests):
+                start = time.perf_counter()
+                status = call(i).status_code
+                latencies.append(time.perf_counter() - start)
+                if status not in expected:
+                    errors += 1
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            result = {
+                "name": _name(f"e2e.{route}", params),
+                "params": params,
+                "requests": args.requests,
+                "errors": errors,
+                "per_op_s": statistics.mean(latencies),
+                "throughput_rps": args.requests / elapsed,
+                "latency_s": {
+                    "p50": latencies[int(0.50 * (len(latencies) - 1))],
+                    "p95": latencies[int(0.95 * (len(latencies) - 1))],
+                    "p99": latencies[int(0.99 * (len(latencies) - 1))],
+                    "max": latencies[-1],
+                },
+            }
+            _progress(f"{result['name']}: {result['throughput_rps']:.0f} req/s, {errors} errors")
+            results.append(result)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-benchmark change in per_op_s against a previous run; positive change is slower"""
+    previous = {result["name"]: result for result in baseline.get("results", []) if "per_op_s" in result}
+    rows = []
+    for result in results:
+        before = previous.get(result["name"])
+        if "per_op_s" not in result or before is None or not before["per_op_s"]:
+            continue
+        change = result["per_op_s"] / before["per_op_s"] - 1
+        rows.append({
+            "name": result["name"],
+            "baseline_s": before["per_op_s"],
+            "current_s": result["per_op_s"],
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    suites = {"storage": bench_storage, "profile": bench_profile, "catalog": bench_catalog, "e2e": bench_e2e}
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "scale": args.scale,
+            "buyers": args.buyers,
+            "products": args.products,
+            "suites": args.suites,
+        },
+        "results": [],
+    }
+    for suite in args.suites:
+        _progress(f"== {suite}")
+        report["results"].extend(suites[suite](args))
+    # compare() matches results by name, so a duplicate would silently hide one of them
+    names = collections.Counter(result["name"] for result in report["results"])
+    duplicates = [name for name, count in names.items() if count > 1]
+    if duplicates:
+        raise RuntimeError(f"Duplicate benchmark names: {', '.join(duplicates)}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmarks for storage, catalog and API routes")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small",
+                        help="preset buyer/catalog sizes (small: 1k; medium: +100k; large: +1M)")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--buyers", type=int, nargs="+", help="buyer counts (overrides --scale)")
+    parser.add_argument("--products", type=int, nargs="+", help="catalog sizes (overrides --scale)")
+    parser.add_argument("--history-lengths", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--file-max-buyers", type=int, default=100000,
+                        help="skip the file backend above this many buyers (every call re-reads the whole file)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repeats per microbenchmark")
+    parser.add_argument("--e2e-buyers", type=int, default=1000)
+    parser.add_argument("--e2e-products", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="stub LLM latency per call (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown counted as a regression when comparing (0.10 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if --compare finds a regression")
+    args = parser.parse_args()
+    args.buyers = args.buyers or SCALES[args.scale]["buyers"]
+    args.products = args.products or SCALES[args.scale]["products"]
+
+    report = run(args)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report["results"], json.load(f), args.threshold)
+        regressions = [row for row in report["comparison"] if row["regression"]]
+        for row in regressions:
+            _progress(f"REGRESSION {row['name']}: {row['baseline_s']:.3g}s -> {row['current_s']:.3g}s "
+                      f"({row['change']:+.0%})")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Startup-time benchmark: import-to-first-request latency of the Flask app.
+
+Each run starts a fresh interpreter, imports `app`, serves a first `GET /categories` through
+the test client and reports the timings as JSON. Compares lazy service construction
+(the default) with PRELOAD_SERVICES.
+
+Usage (from the repository root):
+    python -m benchmarks.startup_benchmark --runs 10 [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from config import Config
+Config.MEMORY_TYPE = "memory"
+Config.PRELOAD_SERVICES = {preload}
+import app as app_module
+imported = time.perf_counter()
+response = app_module.app.test_client().get('/categories')
+first_request = time.perf_counter()
+openai_loaded = 'openai' in sys.modules
+app_module.app.extensions['services'].llm_service.client
+llm_ready = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_request_s": first_request - imported,
+    "import_to_first_request_s": first_request - start,
+    "llm_client_init_s": llm_ready - first_request,
+    "openai_imported_before_llm_use": openai_loaded,
+    "status": response.status_code,
+}}))
+"""
+
+
+def run_once(preload: bool) -> dict:
+    """Run one cold start in a fresh interpreter"""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(preload=preload)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_wall_s"] = time.perf_counter() - started
+    return result
+
+
+def summarize(runs: list) -> dict:
+    """Median/min/max for every numeric field across runs"""
+    summary = {}
+    for key, value in runs[0].items():
+        if not isinstance(value, float):
+            summary[key] = value
+            continue
+        values = [run[key] for run in runs]
+        summary[key] = {
+            "median": statistics.median(values),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"runs": args.runs, "python": sys.version.split()[0], "modes": {}}
+    for mode, preload in (("lazy", False), ("preload", True)):
+        results["modes"][mode] = summarize([run_once(preload) for _ in range(args.runs)])
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""OpenAI-compatible stub LLM for benchmarks.
+
+Provides canned chat completions for the three LLMService prompts, either over HTTP
+(an asyncio server implementing POST /chat/completions) or in process (StubLLMClient,
+a drop-in for the `client` attribute of LLMService/AsyncLLMService).
+
+Usage (from the repository root):
+    python -m benchmarks.stub_llm --port 8001 --delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+ANALYSIS = {
+    "patterns": "Buys mid-priced practical items across a few categories",
+    "preferred_categories": ["electronics", "kitchen"],
+    "price_sensitivity": "moderate",
+    "frequency_analysis": "regular purchaser"
+}
+RECOMMENDATION = {
+    "recommended_category": "books",
+    "reasoning": "Complements existing interests at a lower price point",
+    "suggested_price_range": {"min": 10, "max": 40}
+}
+JUSTIFICATION = "Books fit your practical interests and budget, and pair nicely with what you already own."
+
+
+def completion_content(messages: list) -> str:
+    """Pick the canned answer matching the LLMService prompt that was sent"""
+    system = messages[0]["content"] if messages else ""
+    if "behavior analyst" in system:
+        return json.dumps(ANALYSIS)
+    if "recommendation expert" in system:
+        return json.dumps(RECOMMENDATION)
+    return JUSTIFICATION
+
+
+def completion_payload(messages: list, model: str = "deepseek-chat") -> dict:
+    """Build an OpenAI chat.completion response body"""
+    content = completion_content(messages)
+    prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def _to_namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+class _Completions:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def create(self, model: str = "deepseek-chat", messages: list = (), **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        return _to_namespace(completion_payload(list(messages), model))
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, model: str = "deepseek-chat", messages: list = (), **kwargs):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return _to_namespace(completion_payload(list(messages), model))
+
+
+class StubLLMClient:
+    """In-process stand-in for the OpenAI client: client.chat.completions.create(...)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.chat = SimpleNamespace(completions=_Completions(delay))
+
+
+class AsyncStubLLMClient:
+    """In-process stand-in for the AsyncOpenAI client"""
+
+    def __init__(self, delay: float = 0.0):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(delay))
+
+
+async def _handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float):
+    """Serve keep-alive HTTP/1.1 requests on one connection"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if b"/chat/completions" in request_line:
+                request = json.loads(body or b"{}")
+                if delay:
+                    await asyncio.sleep(delay)
+                status = "200 OK"
+                payload = json.dumps(completion_payload(request.get("messages", []), request.get("model", "deepseek-chat")))
+            else:
+                status = "404 Not Found"
+                payload = json.dumps({"error": {"message": "not found"}})
+
+            data = payload.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                + data
+            )
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, delay: float) -> None:
+    """Run the HTTP stub until cancelled"""
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(reader, writer, delay), host, port, backlog=4096
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds to wait before each completion")
+    args = parser.parse_args()
+    print(f"Stub LLM listening on http://{args.host}:{args.port} (delay {args.delay}s)", flush=True)
+    asyncio.run(serve(args.host, args.port, args.delay))
+
+
+if __name__ == "__main__":
+    main()
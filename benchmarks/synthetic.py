@@ -0,0 +1,135 @@
+"""Seeded synthetic data for benchmarks: product catalogs and buyer profiles.
+
+The same (count, seed) always yields the same data, so results from different commits are
+comparable. Catalogs use the mock catalog's schema and categories (plus a few extra ones);
+buyer histories use the entry shape written by PurchaseService, with lengths drawn from a
+long-tailed distribution (most buyers have a handful of purchases, a few have ten times the mean).
+
+Usage (from the repository root), to write data sets for manual testing:
+    python -m benchmarks.synthetic --products 100000 --catalog-output catalog.json
+    python -m benchmarks.synthetic --buyers 10000 --buyers-output buyers.json
+"""
+import argparse
+import datetime
+import json
+import random
+from typing import Any, Dict, Iterator, List, Sequence
+
+from models.buyer import BuyerProfile
+
+# The mock catalog's categories plus extras; "books" (the stub LLM's recommendation) always has products
+CATEGORIES = ("electronics", "sportswear", "home_decor", "books", "fashion", "kitchen",
+              "toys", "garden", "beauty", "automotive", "pets", "office")
+
+# (min, max) price per category; unknown categories use DEFAULT_PRICE_RANGE
+PRICE_RANGES = {
+    "electronics": (15, 900),
+    "sportswear": (10, 250),
+    "home_decor": (8, 300),
+    "books": (5, 60),
+    "fashion": (10, 500),
+    "kitchen": (8, 400),
+}
+DEFAULT_PRICE_RANGE = (5, 300)
+
+ADJECTIVES = ("Wireless", "Compact", "Premium", "Classic", "Smart", "Portable", "Deluxe",
+              "Eco", "Ultra", "Everyday", "Pro", "Mini")
+NOUNS = ("Headphones", "Shoes", "Lamp", "Novel", "Jacket", "Pan", "Puzzle", "Planter",
+         "Serum", "Charger", "Leash", "Organizer", "Watch", "Mat", "Vase", "Blender")
+PRODUCT_NAMES = tuple(f"{adjective} {noun}" for adjective in ADJECTIVES for noun in NOUNS)
+BRANDS = tuple(f"Brand{index:03d}" for index in range(200))
+# Purchase dates over two years; histories reference these shared strings, which keeps
+# million-buyer data sets from holding millions of copies
+DATES = tuple((datetime.date(2023, 1, 1) + datetime.timedelta(days=day)).isoformat() for day in range(730))
+
+
+def _price(rng: random.Random, category: str):
+    low, high = PRICE_RANGES.get(category, DEFAULT_PRICE_RANGE)
+    # Skewed towards the cheap end, like real catalogs; whole-dollar prices like the mock catalog
+    return int(low + (high - low) * rng.random() ** 2)
+
+
+def generate_products(count: int, seed: int = 0, categories: Sequence[str] = CATEGORIES) -> List[Dict[str, Any]]:
+    """Generate count catalog products with ids 1..count"""
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        category = categories[product_id % len(categories)]
+        products.append({
+            "id": product_id,
+            "name": rng.choice(PRODUCT_NAMES),
+            "category": category,
+            "price": _price(rng, category),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "brand": rng.choice(BRANDS)
+        })
+    return products
+
+
+def history_length(rng: random.Random, mean: float, max_length: int) -> int:
+    """Draw a purchase-history length: at least 1, exponentially distributed, capped"""
+    return min(max_length, 1 + int(rng.expovariate(1 / max(mean - 1, 1e-9))))
+
+
+def generate_history(rng: random.Random, length: int, categories: Sequence[str] = CATEGORIES) -> List[Dict[str, Any]]:
+    """Generate one buyer's history; each buyer favors two or three categories"""
+    favourites = rng.sample(categories, rng.randint(2, 3))
+    history = []
+    for _ in range(length):
+        category = rng.choice(favourites) if rng.random() < 0.8 else rng.choice(categories)
+        history.append({
+            "product": rng.choice(PRODUCT_NAMES),
+            "category": category,
+            "price": _price(rng, category),
+            "date": rng.choice(DATES)
+        })
+    return history
+
+
+def iter_buyers(count: int, seed: int = 0, mean_history: float = 8, max_history: int = 500,
+                categories: Sequence[str] = CATEGORIES) -> Iterator[BuyerProfile]:
+    """Yield count buyer profiles with user ids U0000001, U0000002, ..."""
+    rng = random.Random(seed)
+    for index in range(1, count + 1):
+        length = history_length(rng, mean_history, max_history)
+        yield BuyerProfile(user_id=user_id(index), history=generate_history(rng, length, categories))
+
+
+def generate_buyers(count: int, seed: int = 0, mean_history: float = 8, max_history: int = 500,
+                    categories: Sequence[str] = CATEGORIES) -> List[BuyerProfile]:
+    """Generate count buyer profiles (see iter_buyers)"""
+    return list(iter_buyers(count, seed, mean_history, max_history, categories))
+
+
+def generate_buyer(history_length: int, seed: int = 0, user_index: int = 1) -> BuyerProfile:
+    """Generate a single buyer with an exact history length"""
+    rng = random.Random(seed)
+    return BuyerProfile(user_id=user_id(user_index), history=generate_history(rng, history_length))
+
+
+def user_id(index: int) -> str:
+    return f"U{index:07d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write seeded synthetic catalogs and buyers as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--products", type=int, default=0, help="number of catalog products")
+    parser.add_argument("--catalog-output", help="write {'products': [...]} here (CATALOG_SOURCE_PATH format)")
+    parser.add_argument("--buyers", type=int, default=0, help="number of buyer profiles")
+    parser.add_argument("--mean-history", type=float, default=8)
+    parser.add_argument("--max-history", type=int, default=500)
+    parser.add_argument("--buyers-output", help="write buyers here (MEMORY_FILE_PATH format)")
+    args = parser.parse_args()
+
+    if args.catalog_output:
+        with open(args.catalog_output, "w") as f:
+            json.dump({"products": generate_products(args.products, args.seed)}, f)
+    if args.buyers_output:
+        buyers = iter_buyers(args.buyers, args.seed, args.mean_history, args.max_history)
+        with open(args.buyers_output, "w") as f:
+            json.dump({buyer.user_id: buyer.to_dict() for buyer in buyers}, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,4 +12,32 @@ class Config:
     MEMORY_FILE_PATH = "buyer_history.json"
     
     # Product catalog settings
-    MAX_SEARCH_RESULTS = 3 
\ No newline at end of file
+    MAX_SEARCH_RESULTS = 3
+    # JSON file with the product list (or {"products": [...]}) read on startup and by
+    # POST /catalog/reload; None serves the built-in mock catalog
+    CATALOG_SOURCE_PATH = None
+    # Encode the catalog once into this memory-mapped file and share it read-only across
+    # worker processes (e.g. "/dev/shm/shopping_catalog.bin"); None keeps a per-process copy
+    CATALOG_SHARED_PATH = None
+    
+    # Build all services at startup instead of on first use; enable with gunicorn --preload
+    # so indexes are built once in the master and shared copy-on-write by the workers
+    PRELOAD_SERVICES = False
+    
+    # Serialized GET responses kept for ETag revalidation (0 disables the cache)
+    RESPONSE_CACHE_SIZE = 256
+    
+    # Observability settings
+    METRICS_ENABLED = True  # Expose Prometheus-style metrics at /metrics
+    # Directory for per-process metric files aggregated by /metrics, needed when several worker
+    # processes share a port (e.g. "/dev/shm/shopping_metrics", emptied before each start);
+    # None keeps metrics per process
+    METRICS_MULTIPROCESS_DIR = None
+    
+    # Request profiling (disabled by default; see ProfilingService)
+    PROFILING_ENABLED = False
+    PROFILING_HEADER = "X-Profile"  # Profile any request carrying this header
+    PROFILING_QUERY_PARAM = "profile"  # ...or this query flag, e.g. /analyze/A123?profile=1
+    PROFILING_SAMPLE_RATE = 0.0  # ...or this fraction of all requests
+    PROFILING_OUTPUT_DIR = "profiles"
+    PROFILING_MAX_FILES = 50
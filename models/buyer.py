@@ -1,5 +1,6 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
+import hashlib
 import json
 
 @dataclass
@@ -7,22 +8,30 @@ class BuyerProfile:
     """Data class representing a buyer's profile and history"""
     user_id: str
     history: List[Dict[str, Any]]
+    updated_at: Optional[str] = None  # ISO timestamp (UTC) of the last store
     
     @classmethod
     def from_json(cls, json_data: Dict[str, Any]) -> 'BuyerProfile':
         """Create BuyerProfile from JSON data"""
         return cls(
             user_id=json_data.get('user_id', ''),
-            history=json_data.get('history', [])
+            history=json_data.get('history', []),
+            updated_at=json_data.get('updated_at')
         )
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert BuyerProfile to dictionary"""
         return {
             'user_id': self.user_id,
-            'history': self.history
+            'history': self.history,
+            'updated_at': self.updated_at
         }
     
+    def fingerprint(self) -> str:
+        """Content hash of the profile as stored; changes whenever any stored field changes"""
+        encoded = json.dumps(self.to_dict(), sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:16]
+    
     def add_transaction(self, transaction: Dict[str, Any]) -> None:
         """Add a new transaction to buyer history"""
         self.history.append(transaction)
@@ -49,4 +58,4 @@ class BuyerProfile:
             'min': min(prices),
             'max': max(prices),
             'avg': sum(prices) / len(prices)
-        } 
\ No newline at end of file
+        }
@@ -1,12 +1,289 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import datetime
+import hashlib
 import json
+import os
+import threading
+import time
 from models.buyer import BuyerProfile
+from config import Config
+from services.metrics_service import metrics
+from services.shared_catalog import SharedCatalog, SharedCatalogReader, publish_catalog
+
+def compute_catalog_version(products: List[Dict[str, Any]]) -> str:
+    """Compute a short content hash identifying a catalog"""
+    encoded = json.dumps(products, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+def source_fingerprint(path: str) -> str:
+    """Hash a catalog source file's raw bytes, streamed, without parsing it"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+class CatalogSnapshot:
+    """Immutable, versioned catalog: the products plus their id/category indexes.
+    
+    A snapshot is never modified after it is built; a reload builds a new one and swaps it in,
+    so a request that grabbed a snapshot keeps a consistent view until it finishes.
+    """
+    
+    def __init__(self, products: List[Dict[str, Any]], loaded_at: Optional[datetime.datetime] = None):
+        self.products = tuple(products)
+        # HTTP dates have second resolution
+        self.loaded_at = (loaded_at or datetime.datetime.now(datetime.timezone.utc)).replace(microsecond=0)
+        self.version = compute_catalog_version(products)
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for product in self.products:
+            self._by_id.setdefault(product['id'], product)
+            self._by_category.setdefault(product['category'].lower(), []).append(product)
+        self._categories = sorted(set(product['category'] for product in self.products))
+    
+    def __len__(self) -> int:
+        return len(self.products)
+    
+    def search_by_category(self, category: str, max_results: int) -> List[Dict[str, Any]]:
+        return self._by_category.get(category.lower(), [])[:max_results]
+    
+    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(product_id)
+    
+    def get_all_categories(self) -> List[str]:
+        return list(self._categories)
 
 class CatalogService:
-    """Service for handling product catalog operations"""
+    """Service for handling product catalog operations.
+    
+    The catalog is served from an immutable snapshot: either indexed in process memory
+    (CatalogSnapshot) or, when a shared path is configured, encoded into a memory-mapped file
+    that every worker attaches to read-only (SharedCatalog). It is built on first use, or up
+    front via build_indexes(), and rebuilt from the catalog source by reload().
+    
+    In-memory snapshots are per process, so each process also watches the source file and
+    rebuilds its own snapshot in the background when the file changes; pre-forked workers
+    converge on a new source within about source_check_interval plus the build time.
+    """
+    
+    source_check_interval = 1.0
+    
+    def __init__(self, shared_path: Optional[str] = None, source_path: Optional[str] = None):
+        self.shared_path = shared_path or Config.CATALOG_SHARED_PATH
+        self.source_path = source_path or Config.CATALOG_SOURCE_PATH
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._shared_reader: Optional[SharedCatalogReader] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._published_version: Optional[str] = None
+        self._source_stat: Optional[tuple] = None
+        self._loaded_source: str = ''
+        self._next_source_check = 0.0
+        self.last_reload_seconds: Optional[float] = None
+        self.last_reload_error: Optional[str] = None
+    
+    def snapshot(self):
+        """Current catalog snapshot (CatalogSnapshot or SharedCatalog).
+        
+        Take one snapshot per request and read everything from it, so a concurrent reload
+        cannot mix products from two catalog versions into one response.
+        """
+        if self.shared_path:
+            if self._shared_reader is None:
+                with self._lock:
+                    if self._shared_reader is None:
+                        self._ensure_shared_catalog()
+                        self._shared_reader = SharedCatalogReader(self.shared_path)
+            snapshot = self._shared_reader.current()
+        else:
+            snapshot = self._snapshot
+            if snapshot is None:
+                with self._lock:
+                    if self._snapshot is None:
+                        self._snapshot = self._build_snapshot(None)
+                    snapshot = self._snapshot
+            elif self.source_path:
+                self._check_source()
+        
+        if snapshot.version != self._published_version:
+            self._publish_metrics(snapshot)
+        return snapshot
+    
+    @property
+    def is_built(self) -> bool:
+        """Whether the catalog has been built, i.e. snapshot() will not have to build it"""
+        return (self._shared_reader if self.shared_path else self._snapshot) is not None
+    
+    def _check_source(self) -> None:
+        """Start a background reload if the source file changed since it was last read"""
+        now = time.monotonic()
+        if now < self._next_source_check:
+            return
+        self._next_source_check = now + self.source_check_interval
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != self._source_stat:
+            self.reload_in_background()
     
-    def __init__(self):
-        self.products = self._load_mock_catalog()
+    def _build_snapshot(self, previous: Optional[CatalogSnapshot]) -> CatalogSnapshot:
+        products = self._load_catalog()
+        loaded_at = None
+        if self.source_path:
+            # The source's mtime, so every worker reports the same Last-Modified for it
+            loaded_at = datetime.datetime.fromtimestamp(self._source_stat[2] / 1e9, datetime.timezone.utc)
+        snapshot = CatalogSnapshot(products, loaded_at)
+        if previous is not None and snapshot.version != previous.version and snapshot.loaded_at <= previous.loaded_at:
+            # A changed catalog needs a later Last-Modified, or If-Modified-Since would get a 304
+            snapshot.loaded_at = previous.loaded_at + datetime.timedelta(seconds=1)
+        return snapshot
+    
+    def _publish_metrics(self, snapshot) -> None:
+        self._published_version = snapshot.version
+        metrics.catalog_info.clear()
+        metrics.catalog_info.set(1, version=snapshot.version)
+        metrics.catalog_products.set(len(snapshot))
+    
+    def build_indexes(self) -> None:
+        """Load the catalog and build its indexes now instead of on first use"""
+        self.snapshot()
+    
+    def _ensure_shared_catalog(self) -> None:
+        """Publish the catalog source unless the shared file was already encoded from it.
+        
+        Compares the source fingerprint stored in the file's header, so a worker attaching to an
+        up-to-date file only streams the source through a hash instead of parsing it; a file
+        left behind by an earlier deploy or catalog source is republished rather than served.
+        """
+        if self.source_path:
+            source = source_fingerprint(self.source_path)
+        else:
+            source = compute_catalog_version(self._load_mock_catalog())
+        try:
+            published_source = SharedCatalog(self.shared_path).source
+        except (OSError, ValueError):
+            published_source = None
+        if published_source != source:
+            products = self._load_catalog()
+            publish_catalog(products, self.shared_path, compute_catalog_version(products),
+                            source=self._loaded_source)
+    
+    def publish_shared_catalog(self, products: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Encode the catalog source into the shared file; attached workers switch to it atomically"""
+        source = ''
+        if products is None:
+            products = self._load_catalog()
+            source = self._loaded_source
+        version = compute_catalog_version(products)
+        published_at = time.time()
+        previous = self._shared_reader.current() if self._shared_reader else None
+        if previous is not None and previous.version != version:
+            # As for in-memory snapshots: a changed catalog needs a later Last-Modified
+            published_at = max(published_at, previous.loaded_at.timestamp() + 1)
+        publish_catalog(products, self.shared_path, version, published_at, source)
+    
+    @property
+    def reloading(self) -> bool:
+        """Whether a reload is currently running in this process"""
+        return self._reload_lock.locked()
+    
+    def reload(self) -> Dict[str, Any]:
+        """Rebuild the catalog from its source and swap the new snapshot in.
+        
+        Requests keep reading the previous snapshot while the new one is built; the swap is a
+        single reference assignment. Raises RuntimeError if a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("Catalog reload already in progress")
+        try:
+            return self._reload()
+        finally:
+            self._reload_lock.release()
+    
+    def reload_in_background(self) -> bool:
+        """Start reload() on a daemon thread; returns False if a reload is already running"""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self._reload()
+            except Exception:
+                pass  # recorded in last_reload_error
+            finally:
+                self._reload_lock.release()
+        
+        threading.Thread(target=run, name="catalog-reload", daemon=True).start()
+        return True
+    
+    def _reload(self) -> Dict[str, Any]:
+        previous_version = self.snapshot().version
+        start = time.perf_counter()
+        try:
+            if self.shared_path:
+                self.publish_shared_catalog()
+                snapshot = self._shared_reader.refresh()
+            else:
+                snapshot = self._build_snapshot(self._snapshot)
+                self._snapshot = snapshot
+        except Exception as e:
+            self.last_reload_error = str(e)
+            metrics.catalog_reloads.inc(result="error")
+            print(f"Error reloading catalog: {e}")
+            raise
+        
+        self.last_reload_seconds = time.perf_counter() - start
+        self.last_reload_error = None
+        metrics.catalog_reload_duration.observe(self.last_reload_seconds)
+        metrics.catalog_reloads.inc(result="success")
+        self._publish_metrics(snapshot)
+        return {
+            "previous_version": previous_version,
+            "version": snapshot.version,
+            "total_products": len(snapshot),
+            "reload_seconds": self.last_reload_seconds
+        }
+    
+    @property
+    def products(self):
+        """All products, as a tuple (in-memory) or a lazily decoded sequence (shared)"""
+        return self.snapshot().products
+    
+    @property
+    def version(self) -> str:
+        """Content hash of the catalog; changes whenever any product changes"""
+        return self.snapshot().version
+    
+    @property
+    def loaded_at(self) -> datetime.datetime:
+        """When the current catalog was loaded (or published, for a shared catalog)"""
+        return self.snapshot().loaded_at
+    
+    def _load_catalog(self) -> List[Dict[str, Any]]:
+        """Load products from the catalog source file, or the mock catalog if none is set"""
+        if not self.source_path:
+            products = self._load_mock_catalog()
+            self._loaded_source = compute_catalog_version(products)
+            return products
+        with open(self.source_path, 'rb') as f:
+            # Recorded even if parsing fails, so a broken source is not retried until it changes again
+            stat = os.fstat(f.fileno())
+            self._source_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            raw = f.read()
+        # Fingerprint of the exact bytes parsed, as source_fingerprint() would compute it
+        self._loaded_source = hashlib.sha1(raw).hexdigest()[:16]
+        data = json.loads(raw)
+        del raw
+        products = data['products'] if isinstance(data, dict) else data
+        if not isinstance(products, list):
+            raise ValueError(f"{self.source_path} does not contain a product list")
+        for product in products:
+            missing = [field for field in ('id', 'name', 'category', 'price', 'rating') if field not in product]
+            if missing:
+                raise ValueError(f"Product {product.get('id')} is missing {', '.join(missing)}")
+        return products
     
     def _load_mock_catalog(self) -> List[Dict[str, Any]]:
         """Load mock product catalog"""
@@ -56,8 +333,7 @@ class CatalogService:
     
     def search_by_category(self, category: str, max_results: int = 3) -> List[Dict[str, Any]]:
         """Search products by category"""
-        category_products = [p for p in self.products if p['category'].lower() == category.lower()]
-        return category_products[:max_results]
+        return self.snapshot().search_by_category(category, max_results)
     
     def rank_products_by_preferences(self, products: List[Dict[str, Any]], buyer_profile: BuyerProfile) -> List[Dict[str, Any]]:
         """Rank products based on buyer's price range and preferences"""
@@ -79,12 +355,8 @@ class CatalogService:
     
     def get_product_by_id(self, product_id: int) -> Dict[str, Any]:
         """Get a specific product by ID"""
-        for product in self.products:
-            if product['id'] == product_id:
-                return product
-        return None
+        return self.snapshot().get_product_by_id(product_id)
     
     def get_all_categories(self) -> List[str]:
         """Get all available product categories"""
-        categories = set(product['category'] for product in self.products)
-        return sorted(list(categories)) 
\ No newline at end of file
+        return self.snapshot().get_all_categories()
\ No newline at end of file
@@ -0,0 +1,88 @@
+from typing import Optional
+import threading
+from services.llm_service import LLMService, AsyncLLMService
+from services.catalog_service import CatalogService
+from services.memory_service import MemoryService, AsyncMemoryService
+from services.purchase_service import PurchaseService
+from services.response_cache import ResponseCache
+
+class ServiceContainer:
+    """Lazily constructed services shared by the Flask app.
+
+    Each service is built on first access, so importing the app (tests, CLI tools, worker boot)
+    does not pay for the LLM client or the catalog indexes. Any service can be overridden by
+    passing an instance to the constructor.
+    """
+    
+    def __init__(self, llm_service: Optional[LLMService] = None,
+                 catalog_service: Optional[CatalogService] = None,
+                 memory_service: Optional[MemoryService] = None,
+                 purchase_service: Optional[PurchaseService] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 async_llm_service: Optional[AsyncLLMService] = None,
+                 async_memory_service: Optional[AsyncMemoryService] = None):
+        self._llm_service = llm_service
+        self._catalog_service = catalog_service
+        self._memory_service = memory_service
+        self._purchase_service = purchase_service
+        self._response_cache = response_cache
+        self._async_llm_service = async_llm_service
+        self._async_memory_service = async_memory_service
+        self._lock = threading.RLock()
+    
+    def _get_or_create(self, attribute: str, factory):
+        service = getattr(self, attribute)
+        if service is None:
+            with self._lock:
+                service = getattr(self, attribute)
+                if service is None:
+                    service = factory()
+                    setattr(self, attribute, service)
+        return service
+    
+    @property
+    def llm_service(self) -> LLMService:
+        return self._get_or_create('_llm_service', LLMService)
+    
+    @property
+    def catalog_service(self) -> CatalogService:
+        return self._get_or_create('_catalog_service', CatalogService)
+    
+    @property
+    def memory_service(self) -> MemoryService:
+        return self._get_or_create('_memory_service', MemoryService)
+    
+    @property
+    def purchase_service(self) -> PurchaseService:
+        return self._get_or_create(
+            '_purchase_service',
+            lambda: PurchaseService(self.memory_service, self.catalog_service)
+        )
+    
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._get_or_create('_response_cache', ResponseCache)
+    
+    @property
+    def async_llm_service(self) -> AsyncLLMService:
+        """LLM service used by the ASGI app"""
+        return self._get_or_create('_async_llm_service', AsyncLLMService)
+    
+    @property
+    def async_memory_service(self) -> AsyncMemoryService:
+        """Async view of memory_service used by the ASGI app; shares its storage"""
+        return self._get_or_create('_async_memory_service', lambda: AsyncMemoryService(self.memory_service))
+    
+    def preload(self) -> None:
+        """Construct everything up front, e.g. in a pre-fork master so workers share the pages"""
+        self.catalog_service.build_indexes()
+        self.memory_service
+        self.purchase_service
+        self.response_cache
+        self.llm_service
+        # Pay for the openai import once in the master, but leave client construction
+        # (and its connection pool) to each worker after the fork
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            pass
@@ -1,25 +1,67 @@
-from openai import OpenAI
 from typing import Dict, List, Any
 import json
+import threading
 from config import Config
 from models.buyer import BuyerProfile
+from services.metrics_service import metrics
+
+ALL_CATEGORIES = ["electronics", "sportswear", "home_decor", "books", "fashion", "kitchen"]
 
 class LLMService:
     """Service for handling LLM-based recommendations using DeepSeek API"""
     
     def __init__(self):
-        try:
-            self.client = OpenAI(
-                api_key=Config.DEEPSEEK_API_KEY,
-                base_url=Config.DEEPSEEK_BASE_URL
-            )
-        except Exception as e:
-            print(f"Warning: Failed to initialize OpenAI client: {e}")
-            print("Continuing with mock responses for testing...")
-            self.client = None
+        # The OpenAI client (and the openai import) is created on first use
+        self._client = None
+        self._client_initialized = False
+        self._client_lock = threading.Lock()
     
-    def analyze_buyer_history(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
-        """Analyze buyer history and generate insights"""
+    def _build_client(self):
+        """Create the OpenAI-compatible client"""
+        from openai import OpenAI
+        return OpenAI(
+            api_key=Config.DEEPSEEK_API_KEY,
+            base_url=Config.DEEPSEEK_BASE_URL
+        )
+    
+    @property
+    def client(self):
+        """OpenAI-compatible client, or None when it cannot be created"""
+        if not self._client_initialized:
+            with self._client_lock:
+                if not self._client_initialized:
+                    try:
+                        self._client = self._build_client()
+                    except Exception as e:
+                        print(f"Warning: Failed to initialize OpenAI client: {e}")
+                        print("Continuing with mock responses for testing...")
+                        self._client = None
+                    self._client_initialized = True
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+        self._client_initialized = True
+    
+    def _create_completion(self, operation: str, **kwargs):
+        """Call the chat completions API, recording latency and token usage"""
+        with metrics.time(metrics.llm_request_duration, operation=operation):
+            response = self.client.chat.completions.create(**kwargs)
+        metrics.record_llm_usage(operation, getattr(response, 'usage', None))
+        return response
+    
+    def _extract_json(self, content: str) -> Dict[str, Any]:
+        """Parse the JSON object embedded in an LLM response"""
+        start_idx = content.find('{')
+        end_idx = content.rfind('}') + 1
+        json_str = content[start_idx:end_idx]
+        return json.loads(json_str)
+    
+    # Buyer history analysis
+    
+    def _analysis_request(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Build the completion arguments for analyze_buyer_history"""
         
         history_text = json.dumps(buyer_profile.history, indent=2)
         
@@ -39,55 +81,63 @@ class LLMService:
         Respond in JSON format with keys: patterns, preferred_categories, price_sensitivity, frequency_analysis
         """
         
+        return dict(
+            model="deepseek-chat",
+            messages=[
+                {"role": "system", "content": "You are an expert shopping behavior analyst. Provide detailed insights in JSON format."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=1000
+        )
+    
+    def _mock_analysis(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Fallback mock response when client is not available"""
+        return {
+            "patterns": f"Based on {len(buyer_profile.history)} purchases, user shows consistent buying behavior",
+            "preferred_categories": buyer_profile.get_product_categories(),
+            "price_sensitivity": "moderate",
+            "frequency_analysis": "regular purchaser"
+        }
+    
+    def _parse_analysis(self, content: str, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Extract the analysis from the LLM response"""
         try:
-            if self.client is None:
-                # Fallback mock response when client is not available
-                return {
-                    "patterns": f"Based on {len(buyer_profile.history)} purchases, user shows consistent buying behavior",
-                    "preferred_categories": buyer_profile.get_product_categories(),
-                    "price_sensitivity": "moderate",
-                    "frequency_analysis": "regular purchaser"
-                }
-            
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "You are an expert shopping behavior analyst. Provide detailed insights in JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            # Parse JSON response
-            content = response.choices[0].message.content
-            # Try to extract JSON from the response
-            try:
-                # Find JSON in the response
-                start_idx = content.find('{')
-                end_idx = content.rfind('}') + 1
-                json_str = content[start_idx:end_idx]
-                return json.loads(json_str)
-            except:
-                # Fallback if JSON parsing fails
-                return {
-                    "patterns": content,
-                    "preferred_categories": buyer_profile.get_product_categories(),
-                    "price_sensitivity": "moderate",
-                    "frequency_analysis": "regular"
-                }
-                
-        except Exception as e:
-            print(f"Error analyzing buyer history: {e}")
+            return self._extract_json(content)
+        except:
+            # Fallback if JSON parsing fails
             return {
-                "patterns": "Unable to analyze patterns",
+                "patterns": content,
                 "preferred_categories": buyer_profile.get_product_categories(),
                 "price_sensitivity": "moderate",
                 "frequency_analysis": "regular"
             }
     
-    def recommend_product_category(self, buyer_profile: BuyerProfile, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Recommend a new product category based on analysis"""
+    def _analysis_error_fallback(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        return {
+            "patterns": "Unable to analyze patterns",
+            "preferred_categories": buyer_profile.get_product_categories(),
+            "price_sensitivity": "moderate",
+            "frequency_analysis": "regular"
+        }
+    
+    def analyze_buyer_history(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Analyze buyer history and generate insights"""
+        try:
+            if self.client is None:
+                return self._mock_analysis(buyer_profile)
+            
+            response = self._create_completion('analyze', **self._analysis_request(buyer_profile))
+            return self._parse_analysis(response.choices[0].message.content, buyer_profile)
+        
+        except Exception as e:
+            print(f"Error analyzing buyer history: {e}")
+            return self._analysis_error_fallback(buyer_profile)
+    
+    # Category recommendation
+    
+    def _recommendation_request(self, buyer_profile: BuyerProfile, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the completion arguments for recommend_product_category"""
         
         current_categories = buyer_profile.get_product_categories()
         price_range = buyer_profile.get_price_range()
@@ -104,64 +154,76 @@ class LLMService:
         Provide the recommendation in JSON format with keys: recommended_category, reasoning, suggested_price_range
         """
         
+        return dict(
+            model="deepseek-chat",
+            messages=[
+                {"role": "system", "content": "You are a product recommendation expert. Suggest new product categories based on buyer behavior."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.8,
+            max_tokens=500
+        )
+    
+    def _mock_recommendation(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Fallback mock response when client is not available"""
+        current_categories = buyer_profile.get_product_categories()
+        price_range = buyer_profile.get_price_range()
+        print(f"DEBUG: Current categories: {current_categories}")  # Debug output
+        
+        # Suggest a category not in their current list
+        new_categories = [cat for cat in ALL_CATEGORIES if cat not in current_categories]
+        print(f"DEBUG: Available new categories: {new_categories}")  # Debug output
+        
+        recommended = new_categories[0]  # Default to books instead of home_decor
+        
+        return {
+            "recommended_category": recommended,
+            "reasoning": f"Based on your purchase history in {', '.join(current_categories)}, {recommended} would complement your lifestyle and expand your interests",
+            "suggested_price_range": price_range
+        }
+    
+    def _parse_recommendation(self, content: str, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Extract the recommendation from the LLM response"""
+        try:
+            return self._extract_json(content)
+        except:
+            price_range = buyer_profile.get_price_range()
+            return {
+                "recommended_category": "home_decor",
+                "reasoning": content,
+                "suggested_price_range": {"min": price_range['min'], "max": price_range['max']}
+            }
+    
+    def _recommendation_error_fallback(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        # Use the same logic as the mock response
+        current_categories = buyer_profile.get_product_categories()
+        price_range = buyer_profile.get_price_range()
+        new_categories = [cat for cat in ALL_CATEGORIES if cat not in current_categories]
+        recommended = new_categories[0] if new_categories else "books"
+        
+        return {
+            "recommended_category": recommended,
+            "reasoning": f"Based on your purchase history, {recommended} would be a great new category to explore",
+            "suggested_price_range": {"min": price_range['min'], "max": price_range['max']}
+        }
+    
+    def recommend_product_category(self, buyer_profile: BuyerProfile, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Recommend a new product category based on analysis"""
         try:
             if self.client is None:
-                # Fallback mock response when client is not available
-                current_categories = buyer_profile.get_product_categories()
-                print(f"DEBUG: Current categories: {current_categories}")  # Debug output
-                
-                # Suggest a category not in their current list
-                all_categories = ["electronics", "sportswear", "home_decor", "books", "fashion", "kitchen"]
-                new_categories = [cat for cat in all_categories if cat not in current_categories]
-                print(f"DEBUG: Available new categories: {new_categories}")  # Debug output
-                
-                recommended = new_categories[0]  # Default to books instead of home_decor
-                
-                return {
-                    "recommended_category": recommended,
-                    "reasoning": f"Based on your purchase history in {', '.join(current_categories)}, {recommended} would complement your lifestyle and expand your interests",
-                    "suggested_price_range": price_range
-                }
-            
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "You are a product recommendation expert. Suggest new product categories based on buyer behavior."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=500
-            )
+                return self._mock_recommendation(buyer_profile)
             
-            content = response.choices[0].message.content
-            try:
-                start_idx = content.find('{')
-                end_idx = content.rfind('}') + 1
-                json_str = content[start_idx:end_idx]
-                return json.loads(json_str)
-            except:
-                return {
-                    "recommended_category": "home_decor",
-                    "reasoning": content,
-                    "suggested_price_range": {"min": price_range['min'], "max": price_range['max']}
-                }
-                
+            response = self._create_completion('recommend', **self._recommendation_request(buyer_profile, analysis))
+            return self._parse_recommendation(response.choices[0].message.content, buyer_profile)
+        
         except Exception as e:
             print(f"Error generating recommendation: {e}")
-            # Use the same logic as the fallback above
-            current_categories = buyer_profile.get_product_categories()
-            all_categories = ["electronics", "sportswear", "home_decor", "books", "fashion", "kitchen"]
-            new_categories = [cat for cat in all_categories if cat not in current_categories]
-            recommended = new_categories[0] if new_categories else "books"
-            
-            return {
-                "recommended_category": recommended,
-                "reasoning": f"Based on your purchase history, {recommended} would be a great new category to explore",
-                "suggested_price_range": {"min": price_range['min'], "max": price_range['max']}
-            }
+            return self._recommendation_error_fallback(buyer_profile)
     
-    def justify_recommendation(self, recommendation: Dict[str, Any], buyer_profile: BuyerProfile) -> str:
-        """Provide natural language justification for the recommendation"""
+    # Recommendation justification
+    
+    def _justification_request(self, recommendation: Dict[str, Any], buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Build the completion arguments for justify_recommendation"""
         
         prompt = f"""
         Explain why this product recommendation makes sense for the buyer:
@@ -173,23 +235,94 @@ class LLMService:
         Provide a friendly, conversational explanation (2-3 sentences) of why this recommendation is perfect for this buyer.
         """
         
+        return dict(
+            model="deepseek-chat",
+            messages=[
+                {"role": "system", "content": "You are a friendly shopping assistant explaining recommendations in a conversational tone."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=200
+        )
+    
+    def _mock_justification(self, recommendation: Dict[str, Any]) -> str:
+        """Fallback mock response when client is not available"""
+        return f"Based on your shopping history, {recommendation.get('recommended_category', 'this category')} seems like a great fit for your preferences and budget! It complements your existing purchases perfectly."
+    
+    def _justification_error_fallback(self, recommendation: Dict[str, Any]) -> str:
+        return f"Based on your shopping history, {recommendation.get('recommended_category', 'this category')} seems like a great fit for your preferences and budget!"
+    
+    def justify_recommendation(self, recommendation: Dict[str, Any], buyer_profile: BuyerProfile) -> str:
+        """Provide natural language justification for the recommendation"""
         try:
             if self.client is None:
-                # Fallback mock response when client is not available
-                return f"Based on your shopping history, {recommendation.get('recommended_category', 'this category')} seems like a great fit for your preferences and budget! It complements your existing purchases perfectly."
-            
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "You are a friendly shopping assistant explaining recommendations in a conversational tone."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
+                return self._mock_justification(recommendation)
             
+            response = self._create_completion('justify', **self._justification_request(recommendation, buyer_profile))
             return response.choices[0].message.content.strip()
+        
+        except Exception as e:
+            print(f"Error generating justification: {e}")
+            return self._justification_error_fallback(recommendation)
+
+
+class AsyncLLMService(LLMService):
+    """LLMService variant awaiting the DeepSeek API through AsyncOpenAI.
+    
+    Prompts, parsing and fallbacks are shared with LLMService; only the network calls differ,
+    so an in-flight request waits on the event loop instead of holding a thread.
+    """
+    
+    def _build_client(self):
+        """Create the async OpenAI-compatible client"""
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(
+            api_key=Config.DEEPSEEK_API_KEY,
+            base_url=Config.DEEPSEEK_BASE_URL
+        )
+    
+    async def _create_completion(self, operation: str, **kwargs):
+        """Await the chat completions API, recording latency and token usage"""
+        with metrics.time(metrics.llm_request_duration, operation=operation):
+            response = await self.client.chat.completions.create(**kwargs)
+        metrics.record_llm_usage(operation, getattr(response, 'usage', None))
+        return response
+    
+    async def analyze_buyer_history(self, buyer_profile: BuyerProfile) -> Dict[str, Any]:
+        """Analyze buyer history and generate insights"""
+        try:
+            if self.client is None:
+                return self._mock_analysis(buyer_profile)
             
+            response = await self._create_completion('analyze', **self._analysis_request(buyer_profile))
+            return self._parse_analysis(response.choices[0].message.content, buyer_profile)
+        
+        except Exception as e:
+            print(f"Error analyzing buyer history: {e}")
+            return self._analysis_error_fallback(buyer_profile)
+    
+    async def recommend_product_category(self, buyer_profile: BuyerProfile, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Recommend a new product category based on analysis"""
+        try:
+            if self.client is None:
+                return self._mock_recommendation(buyer_profile)
+            
+            response = await self._create_completion('recommend', **self._recommendation_request(buyer_profile, analysis))
+            return self._parse_recommendation(response.choices[0].message.content, buyer_profile)
+        
+        except Exception as e:
+            print(f"Error generating recommendation: {e}")
+            return self._recommendation_error_fallback(buyer_profile)
+    
+    async def justify_recommendation(self, recommendation: Dict[str, Any], buyer_profile: BuyerProfile) -> str:
+        """Provide natural language justification for the recommendation"""
+        try:
+            if self.client is None:
+                return self._mock_justification(recommendation)
+            
+            response = await self._create_completion('justify', **self._justification_request(recommendation, buyer_profile))
+            return response.choices[0].message.content.strip()
+        
         except Exception as e:
             print(f"Error generating justification: {e}")
-            return f"Based on your shopping history, {recommendation.get('recommended_category', 'this category')} seems like a great fit for your preferences and budget!" 
\ No newline at end of file
+            return self._justification_error_fallback(recommendation)
@@ -1,8 +1,12 @@
+import asyncio
+import datetime
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Callable, Optional
 from models.buyer import BuyerProfile
 from config import Config
+from services.metrics_service import metrics
 
 class MemoryService:
     """Service for handling buyer history storage and retrieval"""
@@ -21,24 +25,58 @@ class MemoryService:
         with open(self.file_path, 'w') as f:
             json.dump({}, f)
     
+    def _read_file_data(self) -> Dict[str, Any]:
+        """Load the whole JSON store from disk, recording latency and size"""
+        if not os.path.exists(self.file_path):
+            return {}
+        with metrics.time(metrics.storage_duration, backend="file", operation="read"):
+            with open(self.file_path, 'r') as f:
+                content = f.read()
+            data = json.loads(content)
+        metrics.storage_bytes.observe(len(content), backend="file", operation="read")
+        return data
+    
+    def _write_file_data(self, data: Dict[str, Any]) -> None:
+        """Write the whole JSON store to disk, recording latency and size.
+        
+        The store is written to a temporary file and renamed over the old one, so concurrent
+        readers (e.g. AsyncMemoryService reads in worker threads) see either the old or the new
+        file, never a partially written one.
+        """
+        with metrics.time(metrics.storage_duration, backend="file", operation="write"):
+            content = json.dumps(data, indent=2)
+            tmp_path = f"{self.file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(content)
+                os.replace(tmp_path, self.file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        metrics.storage_bytes.observe(len(content), backend="file", operation="write")
+    
+    def _stamp_updated_at(self, buyer_profile: BuyerProfile) -> None:
+        """Record the store time (UTC) as the profile's modification time"""
+        buyer_profile.updated_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    
     def store_buyer_profile(self, buyer_profile: BuyerProfile) -> bool:
         """Store buyer profile in memory"""
         try:
             if self.memory_type == "memory":
-                self.in_memory_storage[buyer_profile.user_id] = buyer_profile.to_dict()
+                with metrics.time(metrics.storage_duration, backend="memory", operation="write"):
+                    self._stamp_updated_at(buyer_profile)
+                    self.in_memory_storage[buyer_profile.user_id] = buyer_profile.to_dict()
             elif self.memory_type == "file":
                 # Load existing data
-                data = {}
-                if os.path.exists(self.file_path):
-                    with open(self.file_path, 'r') as f:
-                        data = json.load(f)
+                data = self._read_file_data()
                 
                 # Update with new profile
+                self._stamp_updated_at(buyer_profile)
                 data[buyer_profile.user_id] = buyer_profile.to_dict()
                 
                 # Save back to file
-                with open(self.file_path, 'w') as f:
-                    json.dump(data, f, indent=2)
+                self._write_file_data(data)
             
             return True
         except Exception as e:
@@ -49,14 +87,13 @@ class MemoryService:
         """Retrieve buyer profile from memory"""
         try:
             if self.memory_type == "memory":
-                if user_id in self.in_memory_storage:
-                    return BuyerProfile.from_json(self.in_memory_storage[user_id])
+                with metrics.time(metrics.storage_duration, backend="memory", operation="read"):
+                    if user_id in self.in_memory_storage:
+                        return BuyerProfile.from_json(self.in_memory_storage[user_id])
             elif self.memory_type == "file":
-                if os.path.exists(self.file_path):
-                    with open(self.file_path, 'r') as f:
-                        data = json.load(f)
-                        if user_id in data:
-                            return BuyerProfile.from_json(data[user_id])
+                data = self._read_file_data()
+                if user_id in data:
+                    return BuyerProfile.from_json(data[user_id])
             return None
         except Exception as e:
             print(f"Error retrieving buyer profile: {e}")
@@ -78,12 +115,51 @@ class MemoryService:
         """Get all stored buyer profiles"""
         try:
             if self.memory_type == "memory":
-                return self.in_memory_storage.copy()
+                with metrics.time(metrics.storage_duration, backend="memory", operation="read"):
+                    return self.in_memory_storage.copy()
             elif self.memory_type == "file":
-                if os.path.exists(self.file_path):
-                    with open(self.file_path, 'r') as f:
-                        return json.load(f)
+                return self._read_file_data()
             return {}
         except Exception as e:
             print(f"Error retrieving all buyers: {e}")
-            return {} 
\ No newline at end of file
+            return {}
+
+
+class AsyncMemoryService:
+    """Async facade over MemoryService for the ASGI app.
+
+    In-memory operations run inline on the event loop; file operations run in worker threads
+    so a slow disk never blocks other requests. Writes are serialized with an asyncio lock
+    because the file backend does a read-modify-write of the whole store; reads are not locked,
+    since MemoryService replaces the store file atomically.
+    """
+    
+    def __init__(self, memory_service: MemoryService):
+        self.memory_service = memory_service
+        self._write_lock = asyncio.Lock()
+    
+    async def _call(self, func: Callable, *args):
+        if self.memory_service.memory_type == "file":
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+    
+    async def run_write(self, func: Callable, *args):
+        """Run a sync callable that writes buyer storage, serialized with other writes"""
+        async with self._write_lock:
+            return await self._call(func, *args)
+    
+    async def store_buyer_profile(self, buyer_profile: BuyerProfile) -> bool:
+        """Store buyer profile in memory"""
+        return await self.run_write(self.memory_service.store_buyer_profile, buyer_profile)
+    
+    async def get_buyer_profile(self, user_id: str) -> Optional[BuyerProfile]:
+        """Retrieve buyer profile from memory"""
+        return await self._call(self.memory_service.get_buyer_profile, user_id)
+    
+    async def update_buyer_history(self, user_id: str, transaction: Dict[str, Any]) -> bool:
+        """Add a new transaction to buyer history"""
+        return await self.run_write(self.memory_service.update_buyer_history, user_id, transaction)
+    
+    async def get_all_buyers(self) -> Dict[str, Dict[str, Any]]:
+        """Get all stored buyer profiles"""
+        return await self._call(self.memory_service.get_all_buyers)
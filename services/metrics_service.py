@@ -0,0 +1,432 @@
+from typing import Dict, List, Any, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import glob
+import math
+import os
+import threading
+import time
+from config import Config
+from services.metrics_store import MetricsFile, read_metrics_file
+
+# Latency buckets (seconds) sized for both sub-millisecond catalog work and multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Per-request (name, seconds) timings; only populated between start_timing_collection() and stop_timing_collection()
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set, e.g. {route="/buyer",method="GET"}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional["MetricsService"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for the given label values"""
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            value = self._values[key] = self._values.get(key, 0.0) + amount
+            if self._registry is not None:
+                self._registry._write(self.name, key, "", value)
+
+    def get(self, **labels: str) -> float:
+        """Current value for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], Any, float]]:
+        with self._lock:
+            return [(key, "", value) for key, value in self._values.items()]
+
+    def _after_fork(self, multiprocess: bool) -> None:
+        self._lock = threading.Lock()
+        if multiprocess:
+            # The parent's file keeps what it counted; this process starts from zero
+            self._values = {}
+
+    def collect(self, samples: Optional[Dict[Tuple[str, ...], Dict[Any, float]]] = None) -> List[str]:
+        """Exposition lines for this process's values, or for aggregated samples"""
+        if samples is None:
+            samples = {key: {sample: value} for key, sample, value in self._samples()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, values in samples.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(values.get('', 0.0))}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional["MetricsService"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given label values"""
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+            if self._registry is not None:
+                self._registry._write(self.name, key, "", value)
+
+    def clear(self) -> None:
+        """Drop all label sets, e.g. before publishing a new info-style value"""
+        with self._lock:
+            if self._registry is not None:
+                for key in self._values:
+                    # NaN marks a removed label set in the multi-process file
+                    self._registry._write(self.name, key, "", math.nan)
+            self._values.clear()
+
+    def get(self, **labels: str) -> float:
+        """Current value for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], Any, float]]:
+        with self._lock:
+            return [(key, "", value) for key, value in self._values.items()]
+
+    def _after_fork(self, multiprocess: bool) -> None:
+        # Gauges describe the process's current state, which the child inherits
+        self._lock = threading.Lock()
+
+    def collect(self, samples: Optional[Dict[Tuple[str, ...], Dict[Any, float]]] = None) -> List[str]:
+        """Exposition lines for this process's values, or for aggregated samples (labelled by pid)"""
+        labelnames = self.labelnames
+        if samples is None:
+            samples = {key: {sample: value} for key, sample, value in self._samples()}
+        else:
+            labelnames += ("pid",)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, values in samples.items():
+            lines.append(f"{self.name}{_format_labels(labelnames, key)} {_format_value(values.get('', 0.0))}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, one series per label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, timing_prefix: str = "",
+                 registry: Optional["MetricsService"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Prefix for the per-request timing names reported by MetricsService.time()
+        self.timing_prefix = timing_prefix
+        self._registry = registry
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record a single observation"""
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            if self._registry is not None:
+                self._registry._write(self.name, key, index, series[0][index])
+                self._registry._write(self.name, key, "sum", series[1])
+                self._registry._write(self.name, key, "count", series[2])
+
+    def get_count(self, **labels: str) -> int:
+        """Number of observations for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        return series[2] if series else 0
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], Any, float]]:
+        """(labels, sample, value) where sample is a bucket index (not cumulative), sum or count"""
+        samples = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._series.items():
+                samples.extend((key, index, bucket_count) for index, bucket_count in enumerate(bucket_counts))
+                samples.extend(((key, "sum", total), (key, "count", count)))
+        return samples
+
+    def _after_fork(self, multiprocess: bool) -> None:
+        self._lock = threading.Lock()
+        if multiprocess:
+            self._series = {}
+
+    def collect(self, samples: Optional[Dict[Tuple[str, ...], Dict[Any, float]]] = None) -> List[str]:
+        """Exposition lines for this process's series, or for aggregated samples"""
+        if samples is None:
+            samples = {}
+            for key, sample, value in self._samples():
+                samples.setdefault(key, {})[sample] = value
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, values in samples.items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets + (float("inf"),)):
+                cumulative += values.get(index, 0)
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(values.get('sum', 0.0))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(values.get('count', 0))}")
+        return lines
+
+
+class MetricsService:
+    """In-process metrics registry rendered in the Prometheus text exposition format.
+
+    By default metrics are kept per process. With Config.METRICS_MULTIPROCESS_DIR set (see
+    enable_multiprocess()) every process also writes its values to its own memory-mapped file
+    in that directory, and render() aggregates all of them, so a scrape answered by any worker
+    covers the whole deployment. With Config.METRICS_ENABLED off every update is a no-op
+    (timings requested by the request profiler are still collected).
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[str] = None
+        self._store: Optional[MetricsFile] = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+        self.http_requests = self.counter(
+            "http_requests_total", "Total HTTP requests by route, method and status",
+            ("method", "route", "status"))
+        self.http_request_duration = self.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route and method",
+            ("method", "route"))
+        self.analyze_stage_duration = self.histogram(
+            "analyze_stage_duration_seconds", "Latency of each stage of the /analyze pipeline",
+            ("stage",))
+        self.llm_request_duration = self.histogram(
+            "llm_request_duration_seconds", "Latency of LLM completion calls by operation",
+            ("operation",), timing_prefix="llm_call_")
+        self.llm_tokens = self.counter(
+            "llm_tokens_total", "LLM tokens consumed by operation and token type",
+            ("operation", "type"))
+        self.storage_duration = self.histogram(
+            "storage_operation_duration_seconds", "Buyer storage read/write latency",
+            ("backend", "operation"), timing_prefix="storage_")
+        self.storage_bytes = self.histogram(
+            "storage_operation_bytes", "Bytes read/written per buyer storage operation",
+            ("backend", "operation"), buckets=BYTES_BUCKETS)
+        self.cache_requests = self.counter(
+            "cache_requests_total", "Cache lookups by cache name and result (hit/miss)",
+            ("cache", "result"))
+        self.catalog_info = self.gauge(
+            "catalog_info", "Catalog snapshot currently served (always 1), labelled by version",
+            ("version",))
+        self.catalog_products = self.gauge(
+            "catalog_products", "Number of products in the current catalog snapshot")
+        self.catalog_reload_duration = self.histogram(
+            "catalog_reload_duration_seconds", "Time to rebuild and swap in a catalog snapshot")
+        self.catalog_reloads = self.counter(
+            "catalog_reloads_total", "Catalog reloads by result (success/error)",
+            ("result",))
+
+        if Config.METRICS_ENABLED and Config.METRICS_MULTIPROCESS_DIR:
+            self.enable_multiprocess(Config.METRICS_MULTIPROCESS_DIR)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        """Register (or return the already registered) counter"""
+        return self._register(name, lambda: Counter(name, documentation, labelnames, registry=self))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        """Register (or return the already registered) gauge"""
+        return self._register(name, lambda: Gauge(name, documentation, labelnames, registry=self))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS, timing_prefix: str = "") -> Histogram:
+        """Register (or return the already registered) histogram"""
+        return self._register(name, lambda: Histogram(name, documentation, labelnames, buckets, timing_prefix,
+                                                      registry=self))
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+    def enable_multiprocess(self, directory: str) -> None:
+        """Share metrics between processes through per-process files in directory.
+
+        Counters and histograms are summed over every file, including those of exited
+        processes, so totals never go backwards; gauges are reported per live process with a
+        pid label. The directory must be emptied before the server starts, or totals carry over
+        from the previous run.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        self._open_store()
+
+    def _open_store(self) -> None:
+        store = MetricsFile(os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.db"))
+        with self._lock:
+            metrics = list(self._metrics.values())
+        self._store = store
+        # Values recorded before the file existed (or inherited gauges, after a fork)
+        for metric in metrics:
+            for key, sample, value in metric._samples():
+                store.write((metric.name, key, sample), value)
+
+    def _write(self, name: str, key: Tuple[str, ...], sample: Any, value: float) -> None:
+        store = self._store
+        if store is not None:
+            store.write((name, key, sample), value)
+
+    def _after_fork(self) -> None:
+        """Runs in a forked child: give it its own locks and, in multi-process mode, its own file"""
+        self._lock = threading.Lock()
+        multiprocess = self.multiprocess_dir is not None
+        for metric in self._metrics.values():
+            metric._after_fork(multiprocess)
+        if multiprocess:
+            # The inherited mapping is the parent's file; leave it to the parent
+            self._store = None
+            self._open_store()
+
+    @contextmanager
+    def time(self, histogram: Histogram, **labels: str):
+        """Context manager observing the elapsed wall-clock time of its block"""
+        if not Config.METRICS_ENABLED and _request_timings.get() is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed, **labels)
+            timings = _request_timings.get()
+            if timings is not None:
+                name = histogram.timing_prefix + "_".join(str(value) for value in labels.values())
+                timings.append((name, elapsed))
+
+    def start_timing_collection(self):
+        """Start collecting the timings recorded by time() in the current context.
+
+        Returns a token to pass to stop_timing_collection().
+        """
+        return _request_timings.set([])
+
+    def stop_timing_collection(self, token) -> List[Tuple[str, float]]:
+        """Stop collecting and return the (name, seconds) timings recorded since start"""
+        timings = _request_timings.get() or []
+        _request_timings.reset(token)
+        return timings
+
+    def record_llm_usage(self, operation: str, usage: Optional[Any]) -> None:
+        """Record token counts from an OpenAI-compatible `response.usage` object"""
+        if usage is None:
+            return
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, token_type, None)
+            if value:
+                self.llm_tokens.inc(value, operation=operation, type=token_type[:-len("_tokens")])
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Record a cache lookup result"""
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+    def render(self) -> str:
+        """Render all registered metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        aggregated = self._aggregate() if self.multiprocess_dir else None
+        lines: List[str] = []
+        for metric in metrics:
+            if aggregated is None:
+                lines.extend(metric.collect())
+            else:
+                lines.extend(metric.collect(aggregated.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+    def _aggregate(self) -> Dict[str, Dict[Tuple[str, ...], Dict[Any, float]]]:
+        """Sum every process's file: metric name -> label values -> sample -> value"""
+        aggregated: Dict[str, Dict[Tuple[str, ...], Dict[Any, float]]] = {}
+        for path in glob.glob(os.path.join(self.multiprocess_dir, "metrics_*.db")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics_"):-len(".db")])
+                entries = list(read_metrics_file(path))
+            except (OSError, ValueError):
+                continue
+            alive = None
+            for (name, key, sample), value in entries:
+                metric = self._metrics.get(name)
+                if metric is None or math.isnan(value):
+                    continue
+                key = tuple(key)
+                if isinstance(metric, Gauge):
+                    if alive is None:
+                        alive = _pid_alive(pid)
+                    if not alive:
+                        continue
+                    key += (str(pid),)
+                series = aggregated.setdefault(name, {}).setdefault(key, {})
+                series[sample] = series.get(sample, 0) + value
+        return aggregated
+
+
+# Process-wide registry shared by the Flask app and the services
+metrics = MetricsService()
@@ -0,0 +1,93 @@
+from typing import Any, Dict, Hashable, Iterator, Tuple
+import json
+import mmap
+import struct
+import threading
+
+# File layout: bytes used (uint64), then entries of (key length (uint32), key as UTF-8 JSON,
+# padding to 8 bytes, value (float64)). Entries are only appended; values are overwritten in place.
+USED = struct.Struct("<Q")
+KEY_LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+INITIAL_SIZE = 64 * 1024
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class MetricsFile:
+    """Memory-mapped file of float values keyed by JSON-serializable tuples, written by one process.
+
+    Used by MetricsService's multi-process mode: every process writes its own file, so an update
+    is a dict lookup plus an 8-byte store with no locking between processes, and any process can
+    read every file to aggregate the whole deployment. Opening truncates the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w+b")
+        self._file.truncate(INITIAL_SIZE)
+        self._mmap = mmap.mmap(self._file.fileno(), INITIAL_SIZE)
+        self._used = USED.size
+        USED.pack_into(self._mmap, 0, self._used)
+        self._offsets: Dict[Hashable, int] = {}
+        # Metrics write from many threads, and growing the file replaces the mapping
+        self._lock = threading.Lock()
+
+    def write(self, key: Tuple, value: float) -> None:
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            VALUE.pack_into(self._mmap, offset, value)
+
+    def _append(self, key: Tuple) -> int:
+        # Keys are only serialized the first time they are written
+        encoded = json.dumps(key).encode("utf-8")
+        value_offset = _align(self._used + KEY_LENGTH.size + len(encoded))
+        end = value_offset + VALUE.size
+        if end > len(self._mmap):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + KEY_LENGTH.size:self._used + KEY_LENGTH.size + len(encoded)] = encoded
+        VALUE.pack_into(self._mmap, value_offset, 0.0)
+        # Published last, so readers never see a partially written entry
+        self._used = end
+        USED.pack_into(self._mmap, 0, end)
+        self._offsets[key] = value_offset
+        return value_offset
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def close(self) -> None:
+        with self._lock:
+            self._mmap.close()
+        self._file.close()
+
+
+def read_metrics_file(path: str) -> Iterator[Tuple[Any, float]]:
+    """Yield the (key, value) entries of a MetricsFile, which may still be being written.
+
+    Keys come back as decoded JSON, i.e. with tuples turned into lists.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < USED.size:
+        return
+    used = min(USED.unpack_from(data, 0)[0], len(data))
+    position = USED.size
+    while position + KEY_LENGTH.size <= used:
+        (length,) = KEY_LENGTH.unpack_from(data, position)
+        value_offset = _align(position + KEY_LENGTH.size + length)
+        if value_offset + VALUE.size > used:
+            break
+        key = json.loads(data[position + KEY_LENGTH.size:position + KEY_LENGTH.size + length])
+        yield key, VALUE.unpack_from(data, value_offset)[0]
+        position = value_offset + VALUE.size
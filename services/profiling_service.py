@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+import cProfile
+import datetime
+import os
+import random
+import re
+import threading
+import time
+from config import Config
+from services.metrics_service import metrics
+
+# Trigger values that do not turn profiling on, e.g. ?profile=0
+FLAG_OFF_VALUES = ("0", "false", "no", "off")
+
+def _flag_set(value: Optional[str]) -> bool:
+    """Whether a trigger header or query flag asks for profiling; a bare ?profile counts as on"""
+    return value is not None and value.strip().lower() not in FLAG_OFF_VALUES
+
+class RequestProfile:
+    """State of a single profiled request"""
+    
+    def __init__(self, profiler: Optional[cProfile.Profile], timing_token):
+        self.profiler = profiler
+        self.timing_token = timing_token
+        self.start_time = time.perf_counter()
+
+
+class ProfilingService:
+    """Opt-in, request-scoped cProfile capture with Server-Timing breakdowns.
+
+    A request is profiled when it carries the trigger header, the trigger query flag,
+    or is picked by the sampling rate. Unselected requests only pay for the selection check.
+    """
+    
+    def __init__(self, header: str = None, query_param: str = None, sample_rate: float = None,
+                 output_dir: str = None, max_files: int = None):
+        self.header = header or Config.PROFILING_HEADER
+        self.query_param = query_param or Config.PROFILING_QUERY_PARAM
+        self.sample_rate = Config.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.output_dir = output_dir or Config.PROFILING_OUTPUT_DIR
+        self.max_files = Config.PROFILING_MAX_FILES if max_files is None else max_files
+        # Held while a cProfile runs: overlapping profilers would corrupt each other's data
+        self._profiler_lock = threading.Lock()
+    
+    def should_profile(self, headers: Dict[str, str], args: Dict[str, str]) -> bool:
+        """Decide whether the current request should be profiled"""
+        header = headers.get(self.header)
+        if (header and _flag_set(header)) or _flag_set(args.get(self.query_param)):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def start(self) -> RequestProfile:
+        """Start profiling the current request"""
+        profiler = None
+        # A request selected while another one is being profiled only gets Server-Timing
+        if self._profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool is already active
+                profiler = None
+                self._profiler_lock.release()
+        return RequestProfile(profiler, metrics.start_timing_collection())
+    
+    def finish(self, profile: RequestProfile, method: str, route: str) -> Tuple[Optional[str], str]:
+        """Stop profiling, write the profile to disk and build the Server-Timing header value.
+
+        Returns (profile file name or None, Server-Timing header value).
+        """
+        total = time.perf_counter() - profile.start_time
+        timings = metrics.stop_timing_collection(profile.timing_token)
+        
+        file_name = None
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            self._profiler_lock.release()
+            file_name = self._write_profile(profile.profiler, method, route, total)
+        
+        return file_name, self.format_server_timing(timings, total)
+    
+    def format_server_timing(self, timings: List[Tuple[str, float]], total: float) -> str:
+        """Format (name, seconds) timings as a Server-Timing header value, summing repeated names"""
+        durations: Dict[str, float] = {}
+        for name, seconds in timings:
+            durations[name] = durations.get(name, 0.0) + seconds
+        durations["total"] = total
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in durations.items())
+    
+    def _write_profile(self, profiler: cProfile.Profile, method: str, route: str, total: float) -> Optional[str]:
+        """Dump pstats output into the profile directory, keeping only the newest files"""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            safe_route = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+            file_name = f"{timestamp}_{method}_{safe_route}_{total * 1000:.0f}ms.prof"
+            profiler.dump_stats(os.path.join(self.output_dir, file_name))
+            self._rotate()
+            return file_name
+        except Exception as e:
+            print(f"Error writing request profile: {e}")
+            return None
+    
+    def _rotate(self) -> None:
+        """Delete the oldest profiles beyond max_files"""
+        profiles = sorted(name for name in os.listdir(self.output_dir) if name.endswith('.prof'))
+        for name in profiles[:max(0, len(profiles) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
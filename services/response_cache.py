@@ -0,0 +1,45 @@
+from typing import Any, Hashable, Optional
+from collections import OrderedDict
+import threading
+from config import Config
+from services.metrics_service import metrics
+
+class ResponseCache:
+    """LRU cache of serialized response bodies.
+
+    Keys must include every input the body depends on (route, arguments and data versions),
+    so entries never need explicit invalidation; stale versions simply age out.
+    """
+    
+    def __init__(self, max_entries: int = None, name: str = "response"):
+        self.max_entries = Config.RESPONSE_CACHE_SIZE if max_entries is None else max_entries
+        self.name = name
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, value is not None)
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,337 @@
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from array import array
+import collections.abc
+import bisect
+import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"SCAT"
+FORMAT_VERSION = 2
+NO_STRING = 0xFFFFFFFF
+
+# magic, format version, byte order ('l'/'b'), product count, distinct ids, string count,
+# category index entries, distinct categories, publish time (epoch seconds), catalog version,
+# source fingerprint (identifies the source file it was encoded from, see CatalogService)
+HEADER = struct.Struct("<4sIc3xQQQQQd16s16s")
+
+# flags column bits
+PRICE_IS_INT = 1
+RATING_IS_INT = 2
+
+REQUIRED_FIELDS = ("id", "name", "category", "price", "rating")
+KNOWN_FIELDS = REQUIRED_FIELDS + ("brand",)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(count: int, n_ids: int, n_strings: int, n_index: int, n_categories: int) -> Dict[str, Tuple[int, str, int]]:
+    """Section name -> (byte offset, array typecode, item count), in file order after the header"""
+    sections = [
+        ("ids", "q", count),
+        ("prices", "d", count),
+        ("ratings", "d", count),
+        ("names", "I", count),
+        ("categories", "I", count),
+        ("brands", "I", count),
+        ("extras", "I", count),
+        ("flags", "B", count),
+        ("sorted_ids", "q", n_ids),
+        ("sorted_id_rows", "I", n_ids),
+        ("category_index", "I", n_index * 3),  # (lower-cased category string, start, count)
+        ("category_rows", "I", count),
+        ("all_categories", "I", n_categories),
+        ("string_offsets", "Q", n_strings + 1),
+    ]
+    layout = {}
+    offset = _align(HEADER.size)
+    for name, typecode, items in sections:
+        layout[name] = (offset, typecode, items)
+        offset = _align(offset + array(typecode).itemsize * items)
+    layout["strings"] = (offset, "B", 0)
+    return layout
+
+
+def encode_catalog(products: Sequence[Dict[str, Any]], version: str, published_at: float = None,
+                   source: str = "") -> bytes:
+    """Encode products into the columnar shared-catalog layout.
+
+    Every product needs an integer id, a string category and numeric price and rating, plus a
+    name; brand is optional. String names and brands are stored in the string table; other
+    values for them (e.g. a null brand) and any other keys are kept as a JSON string per product,
+    so decoding gives back exactly the dict that was encoded.
+    """
+    strings: List[bytes] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return string_id
+
+    columns = {name: array(typecode) for name, typecode in
+               (("ids", "q"), ("prices", "d"), ("ratings", "d"), ("names", "I"),
+                ("categories", "I"), ("brands", "I"), ("extras", "I"), ("flags", "B"))}
+    rows_by_category: Dict[str, List[int]] = {}
+
+    for row, product in enumerate(products):
+        missing = [field for field in REQUIRED_FIELDS if field not in product]
+        if missing:
+            raise ValueError(f"Product {product.get('id')} is missing {', '.join(missing)}")
+        # Refuse values the columns would silently convert, so both catalog modes stay identical
+        if type(product["id"]) is not int:
+            raise ValueError(f"Product id {product['id']!r} is not an integer")
+        if not isinstance(product["category"], str):
+            raise ValueError(f"Product {product['id']} category is not a string")
+        for field in ("price", "rating"):
+            if type(product[field]) not in (int, float):
+                raise ValueError(f"Product {product['id']} {field} is not a number")
+        extras = {key: value for key, value in product.items()
+                  if key not in KNOWN_FIELDS or (key in ("name", "brand") and not isinstance(value, str))}
+
+        columns["ids"].append(product["id"])
+        columns["prices"].append(float(product["price"]))
+        columns["ratings"].append(float(product["rating"]))
+        columns["names"].append(intern(product["name"]) if isinstance(product["name"], str) else NO_STRING)
+        columns["categories"].append(intern(product["category"]))
+        columns["brands"].append(intern(product.get("brand")) if isinstance(product.get("brand"), str) else NO_STRING)
+        columns["extras"].append(intern(json.dumps(extras, sort_keys=True)) if extras else NO_STRING)
+        columns["flags"].append((PRICE_IS_INT if isinstance(product["price"], int) else 0)
+                                | (RATING_IS_INT if isinstance(product["rating"], int) else 0))
+        rows_by_category.setdefault(product["category"].lower(), []).append(row)
+
+    # First product wins on duplicate ids, like the in-memory index
+    id_rows: Dict[int, int] = {}
+    for row, product_id in enumerate(columns["ids"]):
+        id_rows.setdefault(product_id, row)
+    sorted_ids = array("q", sorted(id_rows))
+    sorted_id_rows = array("I", (id_rows[product_id] for product_id in sorted_ids))
+
+    category_index = array("I")
+    category_rows = array("I")
+    for category in sorted(rows_by_category):
+        rows = rows_by_category[category]
+        category_index.extend((intern(category), len(category_rows), len(rows)))
+        category_rows.extend(rows)
+    all_categories = array("I", (intern(category) for category in
+                                 sorted(set(product["category"] for product in products))))
+
+    string_offsets = array("Q", [0])
+    for encoded in strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+
+    sections = dict(columns, sorted_ids=sorted_ids, sorted_id_rows=sorted_id_rows,
+                    category_index=category_index, category_rows=category_rows,
+                    all_categories=all_categories, string_offsets=string_offsets)
+    layout = _layout(len(products), len(sorted_ids), len(strings), len(category_index) // 3, len(all_categories))
+
+    buffer = bytearray(layout["strings"][0] + string_offsets[-1])
+    HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, sys.byteorder[0].encode("ascii"),
+                     len(products), len(sorted_ids), len(strings), len(category_index) // 3, len(all_categories),
+                     time.time() if published_at is None else published_at, version.encode("ascii")[:16],
+                     source.encode("ascii")[:16])
+    for name, (offset, _, _) in layout.items():
+        if name != "strings":
+            data = sections[name].tobytes()
+            buffer[offset:offset + len(data)] = data
+    buffer[layout["strings"][0]:] = b"".join(strings)
+    return bytes(buffer)
+
+
+def publish_catalog(products: Sequence[Dict[str, Any]], path: str, version: str,
+                    published_at: float = None, source: str = "") -> None:
+    """Encode products and atomically replace the shared catalog file at path.
+
+    Readers that already mapped the previous file keep a consistent view of it until they
+    notice the new file and switch over.
+    """
+    data = encode_catalog(products, version, published_at, source)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SharedProductList(collections.abc.Sequence):
+    """Read-only sequence of product dicts decoded on access from a SharedCatalog"""
+
+    def __init__(self, catalog: "SharedCatalog"):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._catalog.product(row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("product index out of range")
+        return self._catalog.product(index)
+
+
+class SharedCatalog:
+    """Read-only, zero-copy view of a catalog file produced by publish_catalog().
+
+    The file is memory-mapped, so every process attached to it shares the same physical pages;
+    product dicts are only materialized for the rows a request actually returns.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, format_version, byteorder, count, n_ids, n_strings, n_index, n_categories,
+         published_at, version, source) = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a shared catalog file (format {FORMAT_VERSION})")
+        if byteorder != sys.byteorder[0].encode("ascii"):
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+
+        self._count = count
+        self.version = version.rstrip(b"\0").decode("ascii")
+        self.source = source.rstrip(b"\0").decode("ascii")
+        self.loaded_at = datetime.datetime.fromtimestamp(int(published_at), datetime.timezone.utc)
+
+        layout = _layout(count, n_ids, n_strings, n_index, n_categories)
+        columns = {}
+        for name, (offset, typecode, items) in layout.items():
+            if name != "strings":
+                size = array(typecode).itemsize * items
+                columns[name] = view[offset:offset + size].cast(typecode)
+        self._ids = columns["ids"]
+        self._prices = columns["prices"]
+        self._ratings = columns["ratings"]
+        self._names = columns["names"]
+        self._categories = columns["categories"]
+        self._brands = columns["brands"]
+        self._extras = columns["extras"]
+        self._flags = columns["flags"]
+        self._sorted_ids = columns["sorted_ids"]
+        self._sorted_id_rows = columns["sorted_id_rows"]
+        self._category_rows = columns["category_rows"]
+        self._string_offsets = columns["string_offsets"]
+        self._strings = view[layout["strings"][0]:]
+
+        # The category tables are tiny; decode them once per process
+        category_index = columns["category_index"]
+        self._category_ranges = {
+            self._string(category_index[i]): (category_index[i + 1], category_index[i + 2])
+            for i in range(0, len(category_index), 3)
+        }
+        self._all_categories = [self._string(string_id) for string_id in columns["all_categories"]]
+
+    def _string(self, string_id: int) -> Optional[str]:
+        if string_id == NO_STRING:
+            return None
+        start = self._string_offsets[string_id]
+        end = self._string_offsets[string_id + 1]
+        return str(self._strings[start:end], "utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def is_current(self) -> bool:
+        """Whether path still refers to the file this view is mapped from"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def product(self, row: int) -> Dict[str, Any]:
+        """Materialize the product stored at row"""
+        flags = self._flags[row]
+        price = self._prices[row]
+        rating = self._ratings[row]
+        product = {
+            "id": self._ids[row],
+            "name": self._string(self._names[row]),
+            "category": self._string(self._categories[row]),
+            "price": int(price) if flags & PRICE_IS_INT else price,
+            "rating": int(rating) if flags & RATING_IS_INT else rating,
+        }
+        brand = self._string(self._brands[row])
+        if brand is not None:
+            product["brand"] = brand
+        extras = self._string(self._extras[row])
+        if extras is not None:
+            product.update(json.loads(extras))
+        return product
+
+    @property
+    def products(self) -> SharedProductList:
+        return SharedProductList(self)
+
+    def search_by_category(self, category: str, max_results: int) -> List[Dict[str, Any]]:
+        start, count = self._category_ranges.get(category.lower(), (0, 0))
+        # Slice like a list, as CatalogSnapshot does (a negative max_results drops from the end)
+        return [self.product(self._category_rows[index]) for index in range(start, start + count)[:max_results]]
+
+    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        # Match dict lookup semantics: 17 and 17.0 find product 17, "17" and 17.5 find nothing
+        if isinstance(product_id, float) and product_id.is_integer():
+            product_id = int(product_id)
+        if not isinstance(product_id, int):
+            return None
+        index = bisect.bisect_left(self._sorted_ids, product_id)
+        if index < len(self._sorted_ids) and self._sorted_ids[index] == product_id:
+            return self.product(self._sorted_id_rows[index])
+        return None
+
+    def get_all_categories(self) -> List[str]:
+        return list(self._all_categories)
+
+
+class SharedCatalogReader:
+    """Keeps the newest SharedCatalog mapped, re-checking the file at most every check_interval seconds.
+
+    A publish_catalog() on the same path swaps the snapshot atomically: callers holding the
+    previous SharedCatalog keep using it, later calls to current() get the new one.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._catalog = SharedCatalog(path)
+        self._next_check = time.monotonic() + check_interval
+        self._lock = threading.Lock()
+
+    def current(self) -> SharedCatalog:
+        catalog = self._catalog
+        now = time.monotonic()
+        if now < self._next_check:
+            return catalog
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                if not self._catalog.is_current():
+                    self._catalog = SharedCatalog(self.path)
+            return self._catalog
+
+    def refresh(self) -> SharedCatalog:
+        """Re-check the file now, e.g. right after this process published a new catalog"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            if not self._catalog.is_current():
+                self._catalog = SharedCatalog(self.path)
+            return self._catalog
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import httpx
+from starlette.testclient import TestClient
+
+from asgi_app import create_asgi_app
+from services.catalog_service import CatalogService
+from services.container import ServiceContainer
+
+
+class SlowCatalogService(CatalogService):
+    """Catalog whose build blocks its thread, like parsing a large source"""
+
+    build_seconds = 0.5
+
+    def _load_catalog(self):
+        time.sleep(self.build_seconds)
+        return super()._load_catalog()
+
+
+def test_first_catalog_build_does_not_block_the_event_loop():
+    app = create_asgi_app(ServiceContainer(catalog_service=SlowCatalogService()))
+    finished = []
+
+    async def get(client, path):
+        response = await client.get(path)
+        finished.append((path, response.status_code))
+
+    async def main():
+        # ASGITransport does not run the lifespan, so the first request triggers the build
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            categories = asyncio.ensure_future(get(client, "/categories"))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await get(client, "/")
+            elapsed = time.perf_counter() - started
+            await categories
+            return elapsed
+
+    elapsed = asyncio.run(main())
+    assert elapsed < SlowCatalogService.build_seconds / 2
+    assert finished == [("/", 200), ("/categories", 200)]
+
+
+def test_catalog_is_built_on_startup():
+    services = ServiceContainer(catalog_service=CatalogService())
+    with TestClient(create_asgi_app(services)):
+        assert services.catalog_service.is_built
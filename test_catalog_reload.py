@@ -0,0 +1,50 @@
+import json
+import time
+
+from services.catalog_service import CatalogService
+
+PRODUCTS = [{"id": i, "name": f"Product {i}", "category": "books", "price": 10 + i, "rating": 4.0} for i in range(1, 6)]
+
+
+def _wait_for_reloads(workers):
+    for worker in workers:
+        worker.snapshot()
+    deadline = time.monotonic() + 5
+    while any(worker.reloading for worker in workers) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_source_change_reaches_every_worker(tmp_path):
+    source_path = tmp_path / "catalog.json"
+    source_path.write_text(json.dumps(PRODUCTS))
+    workers = [CatalogService(source_path=str(source_path)) for _ in range(3)]
+    for worker in workers:
+        worker.source_check_interval = 0
+        worker.build_indexes()
+    previous = workers[0].snapshot()
+
+    # Rewritten within the same second, like a quick fix-up after an edit
+    source_path.write_text(json.dumps([dict(PRODUCTS[0], price=999)] + PRODUCTS[1:]))
+    _wait_for_reloads(workers)
+
+    assert {worker.version for worker in workers} != {previous.version}
+    assert len({worker.version for worker in workers}) == 1
+    assert len({worker.loaded_at for worker in workers}) == 1
+    assert workers[0].loaded_at > previous.loaded_at
+    assert all(worker.get_product_by_id(1)["price"] == 999 for worker in workers)
+    # Requests holding the previous snapshot keep their consistent view
+    assert previous.get_product_by_id(1)["price"] == 11
+
+
+def test_broken_source_keeps_current_snapshot(tmp_path):
+    source_path = tmp_path / "catalog.json"
+    source_path.write_text(json.dumps(PRODUCTS))
+    catalog_service = CatalogService(source_path=str(source_path))
+    catalog_service.source_check_interval = 0
+    version = catalog_service.version
+
+    source_path.write_text("{broken")
+    _wait_for_reloads([catalog_service])
+
+    assert catalog_service.version == version
+    assert catalog_service.last_reload_error
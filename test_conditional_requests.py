@@ -0,0 +1,145 @@
+import json
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+from app import create_app
+from asgi_app import create_asgi_app
+from config import Config
+from services.catalog_service import CatalogService
+from services.container import ServiceContainer
+from services.memory_service import MemoryService
+
+PRODUCTS = [{"id": i, "name": f"Product {i}", "category": "books", "price": 10 + i, "rating": 4.0,
+             "brand": "Acme"} for i in range(1, 6)]
+BUYER = {"user_id": "A123", "history": [{"product": "Novel", "category": "books", "price": 12}]}
+# Well in the past, so responses carry a Last-Modified for it
+SOURCE_MTIME = 1700000000
+SOURCE_LAST_MODIFIED = "Tue, 14 Nov 2023 22:13:20 GMT"
+
+
+def _body(response) -> bytes:
+    # Flask's test client and Starlette's TestClient (httpx) expose the body differently
+    return response.data if hasattr(response, "data") else response.content
+
+
+def _json(response):
+    return json.loads(_body(response))
+
+
+def _services(tmp_path):
+    source_path = tmp_path / "catalog.json"
+    source_path.write_text(json.dumps(PRODUCTS))
+    os.utime(source_path, (SOURCE_MTIME, SOURCE_MTIME))
+    catalog_service = CatalogService(source_path=str(source_path))
+    catalog_service.source_check_interval = float("inf")
+    return ServiceContainer(catalog_service=catalog_service, memory_service=MemoryService())
+
+
+def _client(mode, services):
+    if mode == "flask":
+        return create_app(services).test_client()
+    return TestClient(create_asgi_app(services))
+
+
+@pytest.fixture(autouse=True)
+def memory_storage(monkeypatch):
+    monkeypatch.setattr(Config, "MEMORY_TYPE", "memory")
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def client(request, tmp_path):
+    services = _services(tmp_path)
+    client = _client(request.param, services)
+    client.services = services
+    client.post("/buyer", json=BUYER)
+    return client
+
+
+def test_matching_etag_is_not_modified(client):
+    response = client.get("/categories")
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] == SOURCE_LAST_MODIFIED
+
+    revalidated = client.get("/categories", headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+
+def test_etag_mismatch_ignores_if_modified_since(client):
+    response = client.get("/categories", headers={"If-None-Match": '"stale"',
+                                                  "If-Modified-Since": SOURCE_LAST_MODIFIED})
+    assert response.status_code == 200
+    assert _json(response)["categories"] == ["books"]
+
+
+def test_if_modified_since_without_etag(client):
+    response = client.get("/categories", headers={"If-Modified-Since": SOURCE_LAST_MODIFIED})
+    assert response.status_code == 304
+
+    response = client.get("/categories", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:19 GMT"})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("value", ["yesterday", "Tue, 99 Nov 2023 22:13:20 GMT", ""])
+def test_malformed_if_modified_since_is_ignored(client, value):
+    response = client.get("/categories", headers={"If-Modified-Since": value})
+    assert response.status_code == 200
+
+
+def test_etag_from_before_profile_write_is_stale(client):
+    etag = client.get("/buyer/A123").headers["ETag"]
+    search_etag = client.get("/search/books?user_id=A123").headers["ETag"]
+
+    client.post("/purchase", json={"user_id": "A123", "product_id": 1})
+
+    response = client.get("/buyer/A123", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(_json(response)["history"]) == 2
+    response = client.get("/search/books?user_id=A123", headers={"If-None-Match": search_etag})
+    assert response.status_code == 200
+
+
+def test_last_modified_withheld_during_its_own_second(client):
+    # The profile was just stored: a second write this second would get the same Last-Modified
+    response = client.get("/buyer/A123")
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+    assert client.get("/buyer/A123", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_etag_from_before_catalog_reload_is_stale(client, tmp_path):
+    etag = client.get("/categories").headers["ETag"]
+    search_etag = client.get("/search/books").headers["ETag"]
+
+    (tmp_path / "catalog.json").write_text(json.dumps(PRODUCTS + [dict(PRODUCTS[0], id=6, category="toys")]))
+    client.services.catalog_service.reload()
+
+    response = client.get("/categories", headers={"If-None-Match": etag,
+                                                  "If-Modified-Since": SOURCE_LAST_MODIFIED})
+    assert response.status_code == 200
+    assert _json(response)["categories"] == ["books", "toys"]
+    assert client.get("/search/books", headers={"If-None-Match": search_etag}).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/categories", "/search/books", "/search/books?user_id=A123&max_results=2",
+                                  "/buyer/A123"])
+def test_serving_modes_return_identical_cached_bytes(tmp_path, path):
+    bodies = []
+    for mode in ("flask", "asgi"):
+        (tmp_path / mode).mkdir()
+        services = _services(tmp_path / mode)
+        client = _client(mode, services)
+        client.post("/buyer", json=BUYER)
+        # Profiles carry their store time, which differs between the two runs
+        for profile in services.memory_service.in_memory_storage.values():
+            profile["updated_at"] = "2024-01-01T00:00:00+00:00"
+
+        built = client.get(path)
+        cached = client.get(path)
+        assert built.status_code == cached.status_code == 200
+        assert _body(cached) == _body(built)
+        assert len(services.response_cache) == 1
+        bodies.append(_body(cached))
+    assert bodies[0] == bodies[1]
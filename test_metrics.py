@@ -0,0 +1,227 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from starlette.testclient import TestClient
+
+from app import create_app
+from asgi_app import create_asgi_app
+from benchmarks.stub_llm import AsyncStubLLMClient, StubLLMClient
+from config import Config
+from services.container import ServiceContainer
+from services.llm_service import AsyncLLMService, LLMService
+from services.memory_service import MemoryService
+from services.metrics_service import MetricsService, metrics
+
+REQUEST_LABELS = {"method": "GET", "route": "/categories", "status": 200}
+
+
+def _fork(work):
+    """Run work in a forked child, like a pre-forked worker, and wait for it to exit"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            work()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_multiprocess_mode_aggregates_every_worker(tmp_path):
+    registry = MetricsService()
+    registry.enable_multiprocess(str(tmp_path))
+    registry.http_requests.inc(**REQUEST_LABELS)
+    registry.catalog_products.set(30)
+
+    def worker():
+        registry.http_requests.inc(2, **REQUEST_LABELS)
+        registry.http_request_duration.observe(0.003, method="GET", route="/categories")
+        registry.catalog_products.set(31)
+
+    _fork(worker)
+    _fork(worker)
+    registry.http_request_duration.observe(0.2, method="GET", route="/categories")
+
+    rendered = registry.render()
+    # Counts of exited workers are kept, so totals never go backwards
+    assert 'http_requests_total{method="GET",route="/categories",status="200"} 5' in rendered
+    assert 'http_request_duration_seconds_count{method="GET",route="/categories"} 3' in rendered
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/categories",le="0.005"} 2' in rendered
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/categories",le="+Inf"} 3' in rendered
+    # Gauges are per live process
+    assert [line for line in rendered.splitlines() if line.startswith("catalog_products")] == \
+           [f'catalog_products{{pid="{os.getpid()}"}} 30']
+    # This process's own view is unchanged
+    assert registry.http_requests.get(**REQUEST_LABELS) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_worker_reports_inherited_gauges_and_starts_counters_at_zero(tmp_path):
+    registry = MetricsService()
+    registry.enable_multiprocess(str(tmp_path))
+    registry.http_requests.inc(**REQUEST_LABELS)
+    registry.catalog_info.set(1, version="v1")
+    read, write = os.pipe()
+
+    def worker():
+        registry.http_requests.inc(**REQUEST_LABELS)
+        os.write(write, f"{registry.http_requests.get(**REQUEST_LABELS)}\n{registry.render()}".encode())
+        os.close(write)
+
+    _fork(worker)
+    os.close(write)
+    with os.fdopen(read) as f:
+        own_count, rendered = f.read().split("\n", 1)
+
+    assert float(own_count) == 1
+    assert 'http_requests_total{method="GET",route="/categories",status="200"} 2' in rendered
+    # Rendered while the worker was alive: both processes serve catalog v1
+    assert rendered.count('catalog_info{version="v1",pid=') == 2
+
+
+def test_cleared_gauge_label_sets_are_dropped(tmp_path):
+    registry = MetricsService()
+    registry.enable_multiprocess(str(tmp_path))
+    registry.catalog_info.set(1, version="v1")
+    registry.catalog_info.clear()
+    registry.catalog_info.set(1, version="v2")
+
+    rendered = registry.render()
+    assert 'version="v1"' not in rendered
+    assert f'catalog_info{{version="v2",pid="{os.getpid()}"}} 1' in rendered
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+@pytest.mark.parametrize("mode", ["flask", "asgi"])
+def test_home_lists_metrics_only_when_enabled(monkeypatch, mode, enabled):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", enabled)
+    client = create_app().test_client() if mode == "flask" else TestClient(create_asgi_app())
+
+    endpoints = json.loads(client.get("/").get_data() if mode == "flask" else client.get("/").content)["endpoints"]
+    assert ("GET /metrics" in endpoints) is enabled
+    assert (client.get("/metrics").status_code == 200) is enabled
+
+
+def _block(rendered, name):
+    """Exposition lines of one metric family"""
+    return [line for line in rendered.splitlines()
+            if line.startswith(name) or line.startswith(f"# HELP {name} ") or line.startswith(f"# TYPE {name} ")]
+
+
+def test_exposition_format():
+    registry = MetricsService()
+    counter = registry.counter("test_events_total", "Events by kind", ("kind",))
+    counter.inc(kind='quoted "a"\\b\nc')
+    counter.inc(2.5, kind="plain")
+    registry.gauge("test_level", "Current level").set(0.25)
+    histogram = registry.histogram("test_seconds", "Durations", ("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, stage="load")
+    histogram.observe(0.1, stage="load")
+    histogram.observe(3, stage="load")
+
+    rendered = registry.render()
+    assert rendered.endswith("\n")
+    assert _block(rendered, "test_events_total") == [
+        "# HELP test_events_total Events by kind",
+        "# TYPE test_events_total counter",
+        'test_events_total{kind="quoted \\"a\\"\\\\b\\nc"} 1',
+        'test_events_total{kind="plain"} 2.5',
+    ]
+    assert _block(rendered, "test_level") == [
+        "# HELP test_level Current level",
+        "# TYPE test_level gauge",
+        "test_level 0.25",
+    ]
+    assert _block(rendered, "test_seconds") == [
+        "# HELP test_seconds Durations",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="load",le="0.1"} 2',
+        'test_seconds_bucket{stage="load",le="1"} 2',
+        'test_seconds_bucket{stage="load",le="+Inf"} 3',
+        'test_seconds_sum{stage="load"} 3.15',
+        'test_seconds_count{stage="load"} 3',
+    ]
+    assert histogram.get_count(stage="load") == 3
+    # Registering an existing name returns the registered metric
+    assert registry.counter("test_events_total", "Events by kind", ("kind",)) is counter
+
+
+def test_llm_usage_counts_tokens():
+    registry = MetricsService()
+    registry.record_llm_usage("analyze", SimpleNamespace(prompt_tokens=120, completion_tokens=30, total_tokens=150))
+    registry.record_llm_usage("analyze", SimpleNamespace(prompt_tokens=80, completion_tokens=None))
+    registry.record_llm_usage("justify", None)
+
+    assert registry.llm_tokens.get(operation="analyze", type="prompt") == 200
+    assert registry.llm_tokens.get(operation="analyze", type="completion") == 30
+    assert registry.llm_tokens.get(operation="justify", type="prompt") == 0
+    assert 'llm_tokens_total{operation="analyze",type="prompt"} 200' in registry.render()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", False)
+    registry = MetricsService()
+    registry.http_requests.inc(**REQUEST_LABELS)
+    registry.catalog_products.set(30)
+    registry.catalog_reload_duration.observe(0.5)
+    with registry.time(registry.analyze_stage_duration, stage="catalog_search"):
+        pass
+    registry.record_llm_usage("analyze", SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+
+    assert registry.http_requests.get(**REQUEST_LABELS) == 0
+    assert registry.catalog_products.get() == 0
+    assert registry.catalog_reload_duration.get_count() == 0
+    assert registry.analyze_stage_duration.get_count(stage="catalog_search") == 0
+    assert registry.llm_tokens.get(operation="analyze", type="prompt") == 0
+    assert all(line.startswith("#") for line in registry.render().splitlines())
+
+
+def test_disabled_metrics_still_time_profiled_requests(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", False)
+    registry = MetricsService()
+    token = registry.start_timing_collection()
+    with registry.time(registry.storage_duration, backend="file", operation="read"):
+        pass
+    timings = registry.stop_timing_collection(token)
+
+    assert [name for name, _ in timings] == ["storage_file_read"]
+    assert registry.storage_duration.get_count(backend="file", operation="read") == 0
+
+
+ANALYZE_STAGES = ("profile_load", "llm_analyze", "llm_recommend", "llm_justify", "catalog_search", "catalog_rank")
+
+
+@pytest.mark.parametrize("mode", ["flask", "asgi"])
+def test_analyze_records_stage_and_llm_series(monkeypatch, mode):
+    monkeypatch.setattr(Config, "MEMORY_TYPE", "memory")
+    llm_service = LLMService()
+    llm_service.client = StubLLMClient()
+    async_llm_service = AsyncLLMService()
+    async_llm_service.client = AsyncStubLLMClient()
+    services = ServiceContainer(llm_service=llm_service, async_llm_service=async_llm_service,
+                                memory_service=MemoryService())
+    client = create_app(services).test_client() if mode == "flask" else TestClient(create_asgi_app(services))
+    client.post("/buyer", json={"user_id": "A123", "history": [{"product": "Novel", "category": "books", "price": 12}]})
+
+    stages = {stage: metrics.analyze_stage_duration.get_count(stage=stage) for stage in ANALYZE_STAGES}
+    calls = {operation: metrics.llm_request_duration.get_count(operation=operation)
+             for operation in ("analyze", "recommend", "justify")}
+    prompt_tokens = metrics.llm_tokens.get(operation="analyze", type="prompt")
+    requests = metrics.http_requests.get(method="POST", route="/analyze/<user_id>", status=200)
+
+    assert client.post("/analyze/A123").status_code == 200
+
+    assert {stage: metrics.analyze_stage_duration.get_count(stage=stage) - count
+            for stage, count in stages.items()} == dict.fromkeys(ANALYZE_STAGES, 1)
+    assert {operation: metrics.llm_request_duration.get_count(operation=operation) - count
+            for operation, count in calls.items()} == dict.fromkeys(calls, 1)
+    assert metrics.llm_tokens.get(operation="analyze", type="prompt") > prompt_tokens
+    assert metrics.http_requests.get(method="POST", route="/analyze/<user_id>", status=200) == requests + 1
+
+    rendered = client.get("/metrics")
+    body = rendered.get_data(as_text=True) if mode == "flask" else rendered.text
+    assert rendered.headers["Content-Type"] == MetricsService.CONTENT_TYPE
+    assert 'analyze_stage_duration_seconds_count{stage="llm_justify"}' in body
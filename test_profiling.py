@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+from app import create_app
+from asgi_app import create_asgi_app
+from config import Config
+from services.container import ServiceContainer
+from services.memory_service import MemoryService
+from services.profiling_service import ProfilingService
+
+BUYER = {"user_id": "A123", "history": [{"product": "Novel", "category": "books", "price": 12}]}
+
+
+@pytest.mark.parametrize("headers, args, expected", [
+    ({}, {}, False),
+    ({"X-Profile": "1"}, {}, True),
+    ({"X-Profile": "yes"}, {}, True),
+    ({"X-Profile": "0"}, {}, False),
+    ({"X-Profile": ""}, {}, False),
+    ({}, {"profile": "1"}, True),
+    ({}, {"profile": ""}, True),
+    ({}, {"profile": "0"}, False),
+    ({}, {"profile": "False"}, False),
+    ({}, {"profile": "off"}, False),
+    ({"X-Profile": "0"}, {"profile": "1"}, True),
+])
+def test_should_profile_checks_trigger_values(headers, args, expected):
+    profiling_service = ProfilingService(header="X-Profile", query_param="profile", sample_rate=0)
+    assert profiling_service.should_profile(headers, args) is expected
+
+
+@pytest.mark.parametrize("sample_rate, expected", [(0, False), (1, True)])
+def test_should_profile_samples(sample_rate, expected):
+    assert ProfilingService(sample_rate=sample_rate).should_profile({}, {}) is expected
+
+
+def test_server_timing_sums_repeated_stages():
+    server_timing = ProfilingService().format_server_timing(
+        [("storage_file_read", 0.001), ("llm_call_analyze", 0.25), ("storage_file_read", 0.0005)], 0.3)
+    assert server_timing == "storage_file_read;dur=1.500, llm_call_analyze;dur=250.000, total;dur=300.000"
+
+
+def test_only_one_request_is_cprofiled_at_a_time(tmp_path):
+    profiling_service = ProfilingService(output_dir=str(tmp_path))
+    first = profiling_service.start()
+    overlapping = profiling_service.start()
+
+    overlapping_file, overlapping_timing = profiling_service.finish(overlapping, "GET", "/categories")
+    first_file, _ = profiling_service.finish(first, "GET", "/categories")
+
+    assert overlapping_file is None
+    assert overlapping_timing.startswith("total;dur=")
+    assert first_file in os.listdir(tmp_path)
+    # The profiler is free again afterwards
+    assert profiling_service.finish(profiling_service.start(), "GET", "/")[0] is not None
+
+
+def test_profile_directory_keeps_newest_files(tmp_path):
+    profiling_service = ProfilingService(output_dir=str(tmp_path), max_files=2)
+    file_names = [profiling_service.finish(profiling_service.start(), "GET", f"/route/{index}")[0]
+                  for index in range(4)]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(file_names[-2:])
+    assert file_names[-1].endswith(".prof") and "_GET_route_3_" in file_names[-1]
+
+
+@pytest.fixture
+def profiled_client(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(Config, "PROFILING_OUTPUT_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(Config, "MEMORY_TYPE", "file")
+    monkeypatch.setattr(Config, "MEMORY_FILE_PATH", str(tmp_path / "buyers.json"))
+    services = ServiceContainer(memory_service=MemoryService())
+    if request.param == "flask":
+        client = create_app(services).test_client()
+    else:
+        client = TestClient(create_asgi_app(services))
+    client.post("/buyer", json=BUYER)
+    return client
+
+
+@pytest.mark.parametrize("profiled_client", ["flask", "asgi"], indirect=True)
+def test_profiled_request_gets_server_timing_and_profile_file(profiled_client, tmp_path):
+    response = profiled_client.get("/buyer/A123?profile=1")
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["storage_file_read", "total"]
+    assert os.listdir(tmp_path / "profiles") == [response.headers["X-Profile-File"]]
+    assert "_GET_buyer_user_id_" in response.headers["X-Profile-File"]
+
+
+@pytest.mark.parametrize("profiled_client", ["flask", "asgi"], indirect=True)
+@pytest.mark.parametrize("path, headers", [("/buyer/A123", {}), ("/buyer/A123?profile=0", {}),
+                                           ("/buyer/A123", {"X-Profile": "off"})])
+def test_unselected_request_is_not_profiled(profiled_client, tmp_path, path, headers):
+    response = profiled_client.get(path, headers=headers)
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert "X-Profile-File" not in response.headers
+    assert not os.path.exists(tmp_path / "profiles")
+    body = response.get_data() if hasattr(response, "get_data") else response.content
+    assert json.loads(body)["user_id"] == "A123"
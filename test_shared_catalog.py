@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from services.catalog_service import CatalogService, CatalogSnapshot, compute_catalog_version
+from services.shared_catalog import SharedCatalog, encode_catalog, publish_catalog
+
+# Edge cases the columnar encoding has to round-trip exactly
+PRODUCTS = [
+    {"id": 1, "name": "Wireless Bluetooth Headphones", "category": "electronics", "price": 120, "rating": 4.5, "brand": "AudioTech"},
+    {"id": 2, "name": "Smartphone Case", "category": "Electronics", "price": 24.99, "rating": 4, "brand": "ProtectPro"},
+    {"id": 3, "name": "Café Crème Book ☕", "category": "books", "price": 0, "rating": 5.0},
+    {"id": 4, "name": "No Brand Mug", "category": "kitchen", "price": 9.5, "rating": 3.9, "brand": None},
+    {"id": 5, "name": "Tagged Lamp", "category": "home_decor", "price": 40, "rating": 4.2, "brand": "LightUp",
+     "tags": ["desk", "led"], "stock": {"warehouse": 3}, "discontinued": False},
+    {"id": 17, "name": "Fiction Novel", "category": "books", "price": 12, "rating": 4.5, "brand": "StoryWorld"},
+    {"id": 17, "name": "Duplicate Id", "category": "books", "price": 13, "rating": 4.0, "brand": "Dup"},
+    {"id": -8, "name": "Negative Id", "category": "kitchen", "price": 1, "rating": 1, "brand": ""},
+    {"id": 2 ** 40, "name": "Large Id", "category": "books", "price": 1e6, "rating": 4.4, "brand": "Big"},
+]
+
+
+@pytest.fixture
+def catalogs(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    publish_catalog(PRODUCTS, path, compute_catalog_version(PRODUCTS))
+    return CatalogSnapshot(PRODUCTS), SharedCatalog(path)
+
+
+def test_products_round_trip(catalogs):
+    snapshot, shared = catalogs
+    assert len(shared) == len(snapshot)
+    assert list(shared.products) == list(snapshot.products)
+    for decoded, original in zip(shared.products, PRODUCTS):
+        assert [(key, type(value)) for key, value in sorted(decoded.items())] == \
+               [(key, type(value)) for key, value in sorted(original.items())]
+    assert shared.version == snapshot.version
+
+
+@pytest.mark.parametrize("category", ["books", "BOOKS", "electronics", "kitchen", "home_decor", "toys"])
+@pytest.mark.parametrize("max_results", [-2, -1, 0, 1, 2, 3, 100])
+def test_search_matches_in_memory(catalogs, category, max_results):
+    snapshot, shared = catalogs
+    assert shared.search_by_category(category, max_results) == snapshot.search_by_category(category, max_results)
+
+
+@pytest.mark.parametrize("product_id", [1, 17, 17.0, 17.9, "17", True, None, -8, 2 ** 40, 99, 2 ** 70])
+def test_lookup_matches_in_memory(catalogs, product_id):
+    snapshot, shared = catalogs
+    assert shared.get_product_by_id(product_id) == snapshot.get_product_by_id(product_id)
+
+
+def test_categories_match_in_memory(catalogs):
+    snapshot, shared = catalogs
+    assert shared.get_all_categories() == snapshot.get_all_categories()
+
+
+@pytest.mark.parametrize("field, value", [("id", "17"), ("id", 17.0), ("price", "12"), ("rating", None),
+                                          ("category", 3)])
+def test_encode_rejects_values_it_would_convert(field, value):
+    product = dict(PRODUCTS[0], **{field: value})
+    with pytest.raises(ValueError):
+        encode_catalog([product], "v")
+
+
+def test_stale_shared_file_is_republished(tmp_path):
+    source_path = str(tmp_path / "catalog.json")
+    shared_path = str(tmp_path / "catalog.bin")
+    with open(source_path, "w") as f:
+        json.dump(PRODUCTS[:3], f)
+    assert len(CatalogService(shared_path=shared_path, source_path=source_path).products) == 3
+
+    with open(source_path, "w") as f:
+        json.dump({"products": PRODUCTS}, f)
+    catalog_service = CatalogService(shared_path=shared_path, source_path=source_path)
+    assert list(catalog_service.products) == PRODUCTS
+    assert catalog_service.version == compute_catalog_version(PRODUCTS)
+
+    # An up-to-date file is reused rather than rewritten
+    modified = os.stat(shared_path).st_mtime_ns
+    CatalogService(shared_path=shared_path, source_path=source_path).build_indexes()
+    assert os.stat(shared_path).st_mtime_ns == modified
+
+
+def test_attach_to_current_file_does_not_parse_source(tmp_path, monkeypatch):
+    source_path = str(tmp_path / "catalog.json")
+    shared_path = str(tmp_path / "catalog.bin")
+    with open(source_path, "w") as f:
+        json.dump(PRODUCTS, f)
+    CatalogService(shared_path=shared_path, source_path=source_path).build_indexes()
+
+    def parse_source(self):
+        raise AssertionError("attaching worker parsed the catalog source")
+
+    monkeypatch.setattr(CatalogService, "_load_catalog", parse_source)
+    catalog_service = CatalogService(shared_path=shared_path, source_path=source_path)
+    assert catalog_service.version == compute_catalog_version(PRODUCTS)
+    assert catalog_service.get_product_by_id(17) == PRODUCTS[5]